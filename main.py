@@ -1,14 +1,44 @@
 """App startup."""
 
+from PyQt6.QtCore import QCoreApplication, Qt, QTimer
 from PyQt6.QtWidgets import QApplication
 from sankey_generator.ui.main_window import MainWindow
+from sankey_generator.ui.sankey_url_scheme_handler import SankeyUrlSchemeHandler
 from sankey_generator.controllers.main_controller import MainController
-from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
-from sankey_generator.services.sankey_plotter_service import SankeyPlotterService
 from sankey_generator.services.config_service import ConfigService
 from sankey_generator.models.config import Config
 
 
+def create_parser_service(config: Config):
+    """Create the parser service. Imports pandas, so it is called on the worker thread after the window is shown."""
+    from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
+
+    finanzguru_parser_service: FinanzguruCsvParserService = FinanzguruCsvParserService(
+        config.issues_hierarchy,
+        config.analysis_year_column_name,
+        config.analysis_month_column_name,
+        config.income_node_name,
+        config.amount_out_name,
+        config.other_income_name,
+        config.not_used_income_name,
+    )
+    finanzguru_parser_service.configure_parser(
+        config.input_file,
+        config.income_reference_accounts,
+        config.income_data_frame_filters,
+        config.issues_data_frame_filters,
+        config.streaming_chunk_size,
+    )
+    return finanzguru_parser_service
+
+
+def create_plotter_service(config: Config):
+    """Create the plotter service. Imports plotly, so it is called on the worker thread after the window is shown."""
+    from sankey_generator.services.sankey_plotter_service import SankeyPlotterService
+
+    return SankeyPlotterService(config.amount_out_name)
+
+
 # TODO List:
 # - Add a way to select the input file
 # - Add a way to select the output file
@@ -34,30 +64,21 @@ from sankey_generator.models.config import Config
 
 
 if __name__ == '__main__':
+    # Custom url schemes have to be known before the application is created
+    SankeyUrlSchemeHandler.register_scheme()
+    # The web view is imported after the window was shown, it needs shared OpenGL contexts set before the application is created
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(['Sankey Generator'])
 
     config_service: ConfigService = ConfigService('config.json')
     config: Config = config_service.config
-    sankey_plotter_service: SankeyPlotterService = SankeyPlotterService(config.amount_out_name)
 
-    finanzguru_parser_service: FinanzguruCsvParserService = FinanzguruCsvParserService(
-        config.issues_hierarchy,
-        config.analysis_year_column_name,
-        config.analysis_month_column_name,
-        config.income_node_name,
-        config.amount_out_name,
-        config.other_income_name,
-        config.not_used_income_name,
+    # Initialize controller, the services are created on first use
+    controller = MainController(
+        config_service,
+        lambda: create_parser_service(config),
+        lambda: create_plotter_service(config),
     )
-    finanzguru_parser_service.configure_parser(
-        config.input_file,
-        config.income_reference_accounts,
-        config.income_data_frame_filters,
-        config.issues_data_frame_filters,
-    )
-
-    # Initialize controller
-    controller = MainController(config_service, finanzguru_parser_service, sankey_plotter_service)
 
     # Initialize and show main window
     window = MainWindow(controller)
@@ -65,4 +86,14 @@ if __name__ == '__main__':
 
     window.show()
 
+    def on_first_paint():
+        """Load the heavy parts once the window is on screen."""
+        # the warm up reads the plotly.js bundle, start it before the browser requests it
+        controller.warm_up_services()
+        window.init_browser()
+
+    QTimer.singleShot(0, on_first_paint)
+    # write pending config changes before the application exits
+    app.aboutToQuit.connect(config_service.flush_config)
+
     app.exec()
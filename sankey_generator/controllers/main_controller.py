@@ -1,50 +1,149 @@
 """MainController for the Sankey Generator application."""
 
+from typing import TYPE_CHECKING, Callable
 from sankey_generator.services.theme_service import ThemeService
 from sankey_generator.models.config import Config
+from sankey_generator.models.sankey_tree import SankeyTree
+from sankey_generator.models.theme import Theme
 from sankey_generator.services.config_service import ConfigService
-from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
-from sankey_generator.services.sankey_plotter_service import SankeyPlotterService
-from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest
-from PyQt6.QtCore import QDir, QUrl
+from sankey_generator.services.plotly_asset_service import PlotlyAssetService
+from PyQt6.QtCore import QDir, QTimer, QUrl
 from sankey_generator.utils.observer import Observable, ObserverKeys
-import os
+from sankey_generator.utils.background_job_runner import BackgroundJob, BackgroundJobRunner
+from sankey_generator.utils.lru_byte_cache import LruByteCache
+import hashlib
+import threading
+
+if TYPE_CHECKING:
+    # imported for type hints only, these modules load pandas, plotly and the web engine
+    from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest
+    from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
+    from sankey_generator.services.sankey_plotter_service import SankeyPlotterService
 
 
 class MainController(Observable):
     """Controller for the Sankey Generator application."""
 
+    DIAGRAM_SCHEME = 'sankey'
+    PAGE_STORE_MAX_BYTES = 16 * 1024 * 1024
+    AUTO_GENERATE_DELAY_MS = 400
+    PREFETCH_DELAY_MS = 250
+
     def __init__(
         self,
         config_service: ConfigService,
-        parser_service: FinanzguruCsvParserService,
-        plotter_service: SankeyPlotterService,
+        parser_service_factory: Callable[[], 'FinanzguruCsvParserService'],
+        plotter_service_factory: Callable[[], 'SankeyPlotterService'],
     ):
-        """Initialize the main controller."""
+        """
+        Initialize the main controller.
+
+        The parser and plotter services are created by the factories on first use, so pandas and plotly are not loaded before the window is shown.
+        """
         self.config_service: ConfigService = config_service
-        self.finanzguru_parser_service: FinanzguruCsvParserService = parser_service
-        self.sankey_plotter_service: SankeyPlotterService = plotter_service
+        self.parser_service_factory: Callable[[], FinanzguruCsvParserService] = parser_service_factory
+        self.plotter_service_factory: Callable[[], SankeyPlotterService] = plotter_service_factory
+        self.finanzguru_parser_service: FinanzguruCsvParserService = None
+        self.sankey_plotter_service: SankeyPlotterService = None
+        self.services_lock: threading.Lock = threading.Lock()
         self.theme_manager: ThemeService = ThemeService(config_service)
+        self.plotly_asset_service: PlotlyAssetService = PlotlyAssetService()
         self.current_diagram_url: QUrl = None
+        # pages served to the browser by the url scheme handler
+        self.page_store: LruByteCache = LruByteCache(self.PAGE_STORE_MAX_BYTES)
 
         config: Config = self.config_service.config
         self.current_year: int = config.last_used_year
         self.current_month: int = config.last_used_month
         self.current_issue_level: int = config.last_used_issue_level
         self.sankey_generated: bool = False
+        # True while the browser shows a page with a diagram that can be updated in place
+        self.diagram_page_loaded: bool = False
+        # Data of the diagram shown in the browser, kept to restyle it without parsing the csv again
+        self.current_income_node: SankeyTree = None
+        self.sankey_job_runner: BackgroundJobRunner = BackgroundJobRunner()
+
+        # Auto generation waits until the input did not change for a moment, so typing does not start a generation per keystroke
+        self.auto_generate: bool = False
+        self.auto_generate_timer: QTimer = QTimer()
+        self.auto_generate_timer.setSingleShot(True)
+        self.auto_generate_timer.setInterval(self.AUTO_GENERATE_DELAY_MS)
+        self.auto_generate_timer.timeout.connect(self.on_generate_sankey)
+        # Prefetching starts when a diagram was shown and the worker is idle
+        self.prefetch_timer: QTimer = QTimer()
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(self.PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self._prefetch_adjacent_sankeys)
         super().__init__()
 
+    def get_parser_service(self) -> 'FinanzguruCsvParserService':
+        """Get the parser service, creating it on first use."""
+        with self.services_lock:
+            if self.finanzguru_parser_service is None:
+                self.finanzguru_parser_service = self.parser_service_factory()
+            return self.finanzguru_parser_service
+
+    def get_plotter_service(self) -> 'SankeyPlotterService':
+        """Get the plotter service, creating it on first use."""
+        with self.services_lock:
+            if self.sankey_plotter_service is None:
+                self.sankey_plotter_service = self.plotter_service_factory()
+            return self.sankey_plotter_service
+
+    def warm_up_services(self) -> None:
+        """Create the services on the worker thread, so their modules and the plotly.js bundle are loaded before they are first needed."""
+        self.sankey_job_runner.submit(self._warm_up_services, lambda _: None)
+
+    def _warm_up_services(self, job: BackgroundJob) -> None:
+        """Create the services and read the plotly.js bundle on the worker thread, so the browser does not wait for them on the GUI thread."""
+        self.plotly_asset_service.get_plotly_js_bytes()
+        self.get_parser_service()
+        self.get_plotter_service()
+
+    def _parse_input(self, value: str, minimum: int, maximum: int) -> int | None:
+        """Parse the text of an input field, or None if it is no number within the range."""
+        if not value.isdigit() or not minimum <= int(value) <= maximum:
+            return None
+        return int(value)
+
+    def _get_max_issue_level(self) -> int:
+        """Get the deepest issue level of the issues hierarchy."""
+        issues_hierarchy = self.config_service.config.issues_hierarchy
+        return issues_hierarchy.get_depth() if issues_hierarchy is not None else 0
+
     def set_year(self, year: str):
         """Set the last used year."""
-        self.current_year = int(year)
+        self._set_input_value('current_year', self._parse_input(year, 1, 9999))
 
     def set_month(self, month: str):
         """Set the last used month."""
-        self.current_month = int(month)
+        self._set_input_value('current_month', self._parse_input(month, 1, 12))
 
     def set_issue_level(self, issue_level: str):
         """Set the last used issue level."""
-        self.current_issue_level = int(issue_level)
+        self._set_input_value('current_issue_level', self._parse_input(issue_level, 1, self._get_max_issue_level()))
+
+    def _set_input_value(self, name: str, value: int | None) -> None:
+        """Set a valid input value and schedule the auto generation. An invalid value is ignored and stops a pending auto generation."""
+        if value is None:
+            self.auto_generate_timer.stop()
+            return
+        setattr(self, name, value)
+        self._schedule_auto_generate()
+
+    def set_auto_generate(self, auto_generate: bool) -> None:
+        """Enable or disable the generation of the Sankey diagram whenever the input changes."""
+        self.auto_generate = bool(auto_generate)
+        if self.auto_generate:
+            self._schedule_auto_generate()
+        else:
+            self.auto_generate_timer.stop()
+
+    def _schedule_auto_generate(self) -> None:
+        """Restart the delay of the auto generation."""
+        if self.auto_generate:
+            self.prefetch_timer.stop()
+            self.auto_generate_timer.start()
 
     def _save_last_used_values_to_config(self):
         """Save the last used values."""
@@ -57,14 +156,22 @@ class MainController(Observable):
         self.theme_manager.toggle_theme()
         self.notify_observers(ObserverKeys.THEME_CHANGED, self.theme_manager.get_stylesheet())
 
+    def restyle_sankey(self) -> None:
+        """Apply the colors of the current theme to the shown page and diagram without generating the diagram again."""
+        if self.diagram_page_loaded and self.current_income_node is not None:
+            restyle_script = self.get_plotter_service().get_sankey_theme_script(self.current_income_node)
+        else:
+            restyle_script = self.plotly_asset_service.get_background_script(self.theme_manager.get_colors()['background'])
+        self.notify_observers(ObserverKeys.SANKEY_UPDATED, restyle_script)
+
     def get_initial_html(self) -> str:
         """Get the initial HTML content for the browser."""
         return '<html><body>Welcome to the Sankey Generator!</body></html>'
 
     def generate_sankey(self, year: int, month: int, issue_level: int) -> str:
         """Generate the Sankey diagram."""
-        income_node = self.finanzguru_parser_service.parse_csv(year, month, issue_level)
-        return self.sankey_plotter_service.get_sankey_html(income_node, year, month)
+        income_node = self.get_parser_service().parse_csv(year, month, issue_level)
+        return self.get_plotter_service().get_sankey_html(income_node, year, month)
 
     def on_generate_sankey(self) -> None:
         """Handle the submit button click."""
@@ -77,55 +184,165 @@ class MainController(Observable):
         self.create_and_add_sankey()
 
     def get_html(self, content: str = '') -> str:
-        """Get the HTML content with the given content."""
-        return f'<html><body style="background-color: {self.theme_manager.get_colors()["background"]};">{content}</body></html>'
+        """Get the HTML content with the given content. The page loads the plotly.js bundle served by the browser, the diagram divs don't embed it."""
+        plotly_js_url = f'{self.DIAGRAM_SCHEME}://asset/{self.plotly_asset_service.get_plotly_js_file_name()}'
+        return f'<html><head><meta charset="utf-8"><script src="{plotly_js_url}"></script></head><body style="background-color: {self.theme_manager.get_colors()["background"]};">{content}</body></html>'
+
+    def store_diagram_page(self, content: str = '') -> QUrl:
+        """Store the page with the given content in memory and return the URL it is served under. The same page always gets the same URL."""
+        page = self.get_html(content)
+        page_key = f'{hashlib.blake2b(page.encode("utf-8"), digest_size=16).hexdigest()}.html'
+        self.page_store.put(page_key, page)
+        return QUrl(f'{self.DIAGRAM_SCHEME}://page/{page_key}')
+
+    def get_diagram_shell_url(self) -> QUrl:
+        """Get the URL of an empty diagram page with a warmed up plotly runtime, ready to receive figure data."""
+        return self.store_diagram_page(self.plotly_asset_service.get_diagram_shell(self.theme_manager.get_colors()['background']))
+
+    def show_diagram_shell(self) -> QUrl:
+        """Load the diagram shell as the page of the browser, so the first diagram is pushed into a warm page."""
+        self.current_diagram_url = self.get_diagram_shell_url()
+        self.diagram_page_loaded = False
+        return self.current_diagram_url
+
+    def on_diagram_page_load_finished(self, url: QUrl, ok: bool) -> None:
+        """Handle a finished page load of the browser. Later diagrams are pushed into the page once it is loaded."""
+        if url == self.current_diagram_url:
+            self.diagram_page_loaded = ok
 
     def create_and_add_sankey(self):
-        """Create and add the Sankey diagram to the browser."""
-        fig_html: str = ''
-        if self.sankey_generated:
-            config: Config = self.config_service.config
-            current_year = config.last_used_year
-            current_month = config.last_used_month
-            current_issue_level = config.last_used_issue_level
-            if not current_year or not current_month or not current_issue_level:
-                # TODO: Replace with validation -> Disbale button on errors
-                return
+        """
+        Create and add the Sankey diagram to the browser.
 
-            fig_html = self._generate_sankey_html(int(current_year), int(current_month), int(current_issue_level))
+        The diagram is generated by a background job, a newer request supersedes a running one. The first diagram is loaded as a new page,
+        later diagrams only push their data and layout into the loaded page.
+        """
+        if not self.sankey_generated:
+            self._show_diagram_page()
+            return
 
-        # Save the HTML to a temporary file
-        temp_file = 'temp_plot.html'
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(self.get_html(fig_html))
+        config: Config = self.config_service.config
+        current_year = config.last_used_year
+        current_month = config.last_used_month
+        current_issue_level = config.last_used_issue_level
+        if not current_year or not current_month or not current_issue_level:
+            # TODO: Replace with validation -> Disbale button on errors
+            return
+
+        year, month, issue_level = int(current_year), int(current_month), int(current_issue_level)
+        update_loaded_page = self.diagram_page_loaded
+        self.sankey_job_runner.submit(
+            lambda job: self._generate_sankey(job, year, month, issue_level, update_loaded_page),
+            self._on_sankey_generated,
+            self._on_sankey_generation_failed,
+            self._on_sankey_generation_progress,
+        )
 
-        # Load the file in WebView
-        current_diagram_url: QUrl = QUrl.fromLocalFile(os.path.abspath(temp_file))
+    def _show_diagram_page(self, fig_html: str = '') -> None:
+        """Load a new page with the given diagram, or the diagram shell, into the browser."""
+        if fig_html:
+            self.current_diagram_url = self.store_diagram_page(fig_html)
+            self.diagram_page_loaded = False
+        else:
+            self.show_diagram_shell()
         # Notify observers about the new diagram URL
-        self.notify_observers(ObserverKeys.SANKEY_GENERATED, current_diagram_url)
+        self.notify_observers(ObserverKeys.SANKEY_GENERATED, self.current_diagram_url)
+
+    def _generate_sankey(self, job: BackgroundJob, year: int, month: int, issue_level: int, update_loaded_page: bool) -> tuple[SankeyTree, str, bool, bool] | None:
+        """
+        Generate the Sankey diagram for the given year, month and issue level on the worker thread.
+
+        Returns the tree, the HTML div or the update script for the loaded page, whether the loaded page is updated and the theme it was rendered with.
+        """
+        job.report_progress(f'Parsing transactions of {year}-{month:02d}...')
+        income_node = self.get_parser_service().parse_csv(year, month, issue_level)
+        if job.is_cancelled():
+            return None
+
+        job.report_progress(f'Rendering Sankey diagram of {year}-{month:02d}...')
+        dark_mode = Theme.dark_mode
+        if update_loaded_page:
+            content = self.get_plotter_service().get_sankey_update_script(income_node, year, month)
+        else:
+            content = self.get_plotter_service().get_sankey_html(income_node, year, month)
+
+        print('Sankey generated')
+
+        return income_node, content, update_loaded_page, dark_mode
+
+    def _on_sankey_generated(self, result: tuple[SankeyTree, str, bool, bool] | None) -> None:
+        """Show the generated Sankey diagram. Called on the GUI thread."""
+        if result is None:
+            return
+
+        income_node, content, update_loaded_page, dark_mode = result
+        self.current_income_node = income_node
+        if update_loaded_page:
+            # Notify observers to update the diagram of the loaded page
+            self.notify_observers(ObserverKeys.SANKEY_UPDATED, content)
+        else:
+            self._show_diagram_page(content)
+        if dark_mode != Theme.dark_mode:
+            # the theme was toggled while the diagram was generated
+            self.restyle_sankey()
 
         print(
             f'Generating Sankey diagram for {self.current_year}-{self.current_month} with issue level {self.current_issue_level}'
         )
-        self.notify_observers(ObserverKeys.INFO_MESSAGE, 'Sankey diagram generated successfully.')
-
-    def _generate_sankey_html(self, year, month, issue_level) -> str:
-        """Generate the Sankey diagram for the given year, month and issue level."""
-        # Parse CSV and plot Sankey diagram
-        income_node = self.finanzguru_parser_service.parse_csv(
-            year,
-            month,
-            issue_level,
-        )
+        if self.auto_generate:
+            # no message box for every change of the input
+            self.notify_observers(ObserverKeys.SANKEY_PROGRESS, 'Sankey diagram generated successfully.')
+        else:
+            self.notify_observers(ObserverKeys.SANKEY_PROGRESS, '')
+            self.notify_observers(ObserverKeys.INFO_MESSAGE, 'Sankey diagram generated successfully.')
+        self.prefetch_timer.start()
 
-        # Generate the interactive Sankey diagram as an HTML div
-        fig_html = self.sankey_plotter_service.get_sankey_html(income_node, year, month)
+    def _get_adjacent_sankey_requests(self, year: int, month: int, issue_level: int) -> list[tuple[int, int, int]]:
+        """Get the year, month and issue level of the diagrams most likely requested next: the next and the previous month, then the other issue levels."""
+        month_key = year * 12 + month - 1
+        requests = [((month_key + 1) // 12, (month_key + 1) % 12 + 1, issue_level), ((month_key - 1) // 12, (month_key - 1) % 12 + 1, issue_level)]
+        max_issue_level = self.config_service.config.issues_hierarchy.get_depth()
+        requests += [(year, month, level) for level in range(1, max_issue_level + 1) if level != issue_level]
+        return requests
 
-        print('Sankey generated')
+    def _prefetch_adjacent_sankeys(self) -> None:
+        """Generate the adjacent diagrams in the background, so they are served from the caches when requested."""
+        if self.sankey_job_runner.is_running() or self.current_income_node is None:
+            return
+        if self.config_service.config.streaming_chunk_size:
+            # in streaming mode every diagram reads the whole file again
+            return
+
+        config: Config = self.config_service.config
+        requests = self._get_adjacent_sankey_requests(int(config.last_used_year), int(config.last_used_month), int(config.last_used_issue_level))
+        update_loaded_page = self.diagram_page_loaded
+        self.sankey_job_runner.submit(lambda job: self._prefetch_sankeys(job, requests, update_loaded_page), lambda _: None)
+
+    def _prefetch_sankeys(self, job: BackgroundJob, requests: list[tuple[int, int, int]], update_loaded_page: bool) -> None:
+        """Build the trees and render the diagrams of the requests on the worker thread, until the job is superseded by a real request."""
+        for year, month, issue_level in requests:
+            if job.is_cancelled():
+                return
+            income_node = self.get_parser_service().parse_csv(year, month, issue_level)
+            if update_loaded_page:
+                self.get_plotter_service().get_sankey_update_script(income_node, year, month)
+            else:
+                self.get_plotter_service().get_sankey_html(income_node, year, month)
+
+    def _on_sankey_generation_failed(self, message: str) -> None:
+        """Show the error of a failed Sankey generation. Called on the GUI thread."""
+        if self.auto_generate:
+            # no message box for every pause in typing
+            self.notify_observers(ObserverKeys.SANKEY_PROGRESS, f'Sankey diagram could not be generated: {message}')
+            return
+        self.notify_observers(ObserverKeys.SANKEY_PROGRESS, '')
+        self.notify_observers(ObserverKeys.ERROR_MESSAGE, f'Sankey diagram could not be generated: {message}')
 
-        return fig_html
+    def _on_sankey_generation_progress(self, message: str) -> None:
+        """Show the progress of the Sankey generation. Called on the GUI thread."""
+        self.notify_observers(ObserverKeys.SANKEY_PROGRESS, message)
 
-    def on_download_requested(self, download_item: QWebEngineDownloadRequest) -> None:
+    def on_download_requested(self, download_item: 'QWebEngineDownloadRequest') -> None:
         """Handle download requests."""
         download_path = QDir.currentPath() + '/output_files'
         QDir().mkpath(download_path)
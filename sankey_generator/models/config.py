@@ -67,6 +67,12 @@ class IssueCategory:
             return 1
         return 1 + self.sub_category.get_depth()
 
+    def get_column_names(self) -> list[str]:
+        """Get the csv column names of this category and all sub categories."""
+        if not self.sub_category:
+            return [self.csv_column_name]
+        return [self.csv_column_name] + self.sub_category.get_column_names()
+
     def to_dict(self) -> dict:
         """Convert the issue category to a dictionary."""
         return {
@@ -96,6 +102,7 @@ class Config:
         last_used_year: int,
         last_used_issue_level: int,
         dark_mode: bool,
+        streaming_chunk_size: int = 0,
     ):
         """Initialize the configuration data."""
         self.input_file: str = input_file
@@ -114,6 +121,7 @@ class Config:
         self.last_used_year: int = last_used_year
         self.last_used_issue_level: int = last_used_issue_level
         self.dark_mode: bool = dark_mode
+        self.streaming_chunk_size: int = streaming_chunk_size
 
     def to_dict(self) -> dict:
         """Convert the configuration data to a dictionary."""
@@ -123,7 +131,7 @@ class Config:
             'income_reference_accounts': [account.to_dict() for account in self.income_reference_accounts],
             'income_data_frame_filters': [filter.to_dict() for filter in self.income_data_frame_filters],
             'issues_data_frame_filters': [filter.to_dict() for filter in self.issues_data_frame_filters],
-            'issues_hierarchy': [self.issues_hierarchy.to_dict()] if self.issues_hierarchy else None,
+            'issues_hierarchy': self.issues_hierarchy.to_dict() if self.issues_hierarchy else None,
             'income_node_name': self.income_node_name,
             'not_used_income_name': self.not_used_income_name,
             'analysis_year_column_name': self.analysis_year_column_name,
@@ -134,4 +142,5 @@ class Config:
             'last_used_year': int(self.last_used_year),
             'last_used_issue_level': int(self.last_used_issue_level),
             'dark_mode': bool(self.dark_mode),
+            'streaming_chunk_size': int(self.streaming_chunk_size),
         }
@@ -0,0 +1,75 @@
+"""Model for a range of analysis months."""
+
+
+class Period:
+    """
+    Inclusive range of months, e.g. a single month, a quarter, a year or the last 12 months.
+
+    Months are identified by a key counting months since year 0 (year * 12 + month - 1), so ranges can be compared and searched as integers.
+    """
+
+    def __init__(self, start_year: int, start_month: int, end_year: int, end_month: int):
+        """Initialize the period from its first and last month."""
+        self.start_key: int = Period.get_month_key(start_year, start_month)
+        self.end_key: int = Period.get_month_key(end_year, end_month)
+        if self.end_key < self.start_key:
+            raise ValueError('end of period must not be before its start')
+
+    @staticmethod
+    def get_month_key(year: int, month: int) -> int:
+        """Get the key of the given month."""
+        if month < 1 or month > 12:
+            raise ValueError('month must be between 1 and 12')
+        return int(year) * 12 + int(month) - 1
+
+    @staticmethod
+    def from_keys(start_key: int, end_key: int) -> 'Period':
+        """Create the period from the keys of its first and last month."""
+        return Period(start_key // 12, start_key % 12 + 1, end_key // 12, end_key % 12 + 1)
+
+    @staticmethod
+    def month(year: int, month: int) -> 'Period':
+        """Create the period of a single month."""
+        return Period(year, month, year, month)
+
+    @staticmethod
+    def year(year: int) -> 'Period':
+        """Create the period of a whole year."""
+        return Period(year, 1, year, 12)
+
+    @staticmethod
+    def quarter(year: int, quarter: int) -> 'Period':
+        """Create the period of a quarter (1 to 4) of a year."""
+        if quarter < 1 or quarter > 4:
+            raise ValueError('quarter must be between 1 and 4')
+        return Period(year, quarter * 3 - 2, year, quarter * 3)
+
+    @staticmethod
+    def last_months(year: int, month: int, count: int) -> 'Period':
+        """Create the period of 'count' months ending with the given month."""
+        if count < 1:
+            raise ValueError('count must be greater than 0')
+        end_key = Period.get_month_key(year, month)
+        return Period.from_keys(end_key - count + 1, end_key)
+
+    def get_start(self) -> tuple[int, int]:
+        """Get year and month of the first month."""
+        return self.start_key // 12, self.start_key % 12 + 1
+
+    def get_end(self) -> tuple[int, int]:
+        """Get year and month of the last month."""
+        return self.end_key // 12, self.end_key % 12 + 1
+
+    def __eq__(self, other) -> bool:
+        """Periods are equal if they cover the same months."""
+        return isinstance(other, Period) and self.start_key == other.start_key and self.end_key == other.end_key
+
+    def __hash__(self) -> int:
+        """Hash the covered months."""
+        return hash((self.start_key, self.end_key))
+
+    def __repr__(self) -> str:
+        """Represent the period by its first and last month."""
+        start_year, start_month = self.get_start()
+        end_year, end_month = self.get_end()
+        return f'Period({start_year}-{start_month:02d}, {end_year}-{end_month:02d})'
@@ -4,34 +4,49 @@ from sankey_generator.models.sankey_node import SankeyNode
 
 
 class SankeyRootNode:
-    """Root node for income. It countains income nodes (left side of the sankey diagram) and it contains issue nodes (right side of the sankey diagram)."""
+    """
+    Root node for income. It countains income nodes (left side of the sankey diagram) and it contains issue nodes (right side of the sankey diagram).
+
+    The totals of income and issues are summed up as nodes are added, so balance checks are O(1).
+    Nodes have to be added with the add methods for that and their amounts must not change afterwards.
+    """
 
     def __init__(self, label):
         """Initialize the income node."""
         self.label: str = label
         self.incomeNodes: list[SankeyNode] = []
         self.issueNodes: list[SankeyNode] = []
+        self.income_amount: float = 0
+        self.issues_amount: float = 0
 
     def add_issue(self, issieNode: SankeyNode):
         """Add an issue to the income node."""
         self.issueNodes.append(issieNode)
+        self.issues_amount += issieNode.amount
 
     def add_issues(self, issueNodes: list[SankeyNode]):
         """Add issues to the income node."""
-        self.issueNodes += issueNodes
+        for issueNode in issueNodes:
+            self.add_issue(issueNode)
 
     def add_income(self, incomeNode: SankeyNode):
         """Add an income to the income node."""
         self.incomeNodes.append(incomeNode)
+        self.income_amount += incomeNode.amount
 
     def add_incomes(self, incomeNodes: list[SankeyNode]):
         """Add incomes to the income node."""
-        self.incomeNodes += incomeNodes
+        for incomeNode in incomeNodes:
+            self.add_income(incomeNode)
 
     def get_issues_amount(self):
         """Get the total amount of issues."""
-        return sum([child.amount for child in self.issueNodes])
+        return self.issues_amount
 
     def get_income_amount(self):
         """Get the total amount of income."""
-        return sum([parent.amount for parent in self.incomeNodes])
+        return self.income_amount
+
+    def get_unused_income_amount(self):
+        """Get the income not covered by issues. It is negative if more is spent than earned."""
+        return self.income_amount - self.issues_amount
@@ -0,0 +1,174 @@
+"""Compact array-backed Sankey tree."""
+
+import hashlib
+from array import array
+
+
+class SankeyTree:
+    """
+    Sankey tree stored in parallel arrays instead of linked node objects.
+
+    Node 0 is the root. Every other node has a parent index, an amount in cents, a label id into the interned label table and a flag telling if it is an income node.
+    Income nodes (left side of the sankey diagram) are children of the root. Issue nodes (right side of the sankey diagram) are children of the root or of other issue nodes.
+    Equal labels share one label id, which is also the node index used in the sankey diagram.
+
+    The totals of income, issues and the linked nodes of every node are kept while nodes are appended, so they can be read in O(1).
+
+    The tree can be read like a SankeyRootNode: 'label', 'incomeNodes', 'issueNodes' and the amount getters return SankeyNode compatible views.
+    """
+
+    ROOT_INDEX = 0
+
+    def __init__(self, label: str):
+        """Initialize the tree with its root node."""
+        self.label_table: list[str] = []
+        self.label_table_ids: dict[str, int] = {}
+        self.parents: array = array('i')
+        self.amounts: array = array('q')
+        self.label_ids: array = array('i')
+        self.income_flags: array = array('b')
+        # sum of the amounts of the child nodes of every node
+        self.linked_amounts: array = array('q')
+        self.income_cents: int = 0
+        self.issues_cents: int = 0
+        self._children: list[list[int]] = None
+        self._append(label, 0, -1, False)
+
+    def __len__(self) -> int:
+        """Get the number of nodes including the root."""
+        return len(self.parents)
+
+    def intern_label(self, label: str) -> int:
+        """Get the id of the label, adding it to the label table if it is new."""
+        label_id = self.label_table_ids.get(label)
+        if label_id is None:
+            label_id = self.label_table_ids[label] = len(self.label_table)
+            self.label_table.append(label)
+        return label_id
+
+    def _append(self, label: str, amount: int, parent_index: int, is_income: bool) -> int:
+        """Append a node and return its index."""
+        self.parents.append(parent_index)
+        self.amounts.append(int(amount))
+        self.label_ids.append(self.intern_label(label))
+        self.income_flags.append(is_income)
+        self.linked_amounts.append(0)
+        if parent_index >= 0:
+            self.linked_amounts[parent_index] += int(amount)
+        if is_income:
+            self.income_cents += int(amount)
+        elif parent_index == self.ROOT_INDEX:
+            self.issues_cents += int(amount)
+        self._children = None
+        return len(self.parents) - 1
+
+    def append_income(self, label: str, amount: int) -> int:
+        """Append an income node with an amount in cents and return its index."""
+        return self._append(label, amount, self.ROOT_INDEX, True)
+
+    def append_issue(self, label: str, amount: int, parent_index: int = ROOT_INDEX) -> int:
+        """Append an issue node with an amount in cents below the given parent and return its index."""
+        if parent_index != self.ROOT_INDEX and self.income_flags[parent_index]:
+            raise ValueError('issue nodes can not be added below income nodes')
+        return self._append(label, amount, parent_index, False)
+
+    def get_label(self, index: int) -> str:
+        """Get the label of a node."""
+        return self.label_table[self.label_ids[index]]
+
+    def get_amount(self, index: int) -> float:
+        """Get the amount of a node as shown in the diagram."""
+        return self.amounts[index] / 100
+
+    def get_children(self, index: int) -> list[int]:
+        """Get the indexes of the child nodes of a node in insertion order."""
+        if self._children is None:
+            self._children = [[] for _ in range(len(self.parents))]
+            for child_index in range(1, len(self.parents)):
+                self._children[self.parents[child_index]].append(child_index)
+        return self._children[index]
+
+    @property
+    def label(self) -> str:
+        """Get the label of the root node."""
+        return self.get_label(self.ROOT_INDEX)
+
+    @property
+    def incomeNodes(self) -> list['SankeyTreeNode']:
+        """Get views of the income nodes."""
+        return [SankeyTreeNode(self, index) for index in self.get_children(self.ROOT_INDEX) if self.income_flags[index]]
+
+    @property
+    def issueNodes(self) -> list['SankeyTreeNode']:
+        """Get views of the top level issue nodes."""
+        return [SankeyTreeNode(self, index) for index in self.get_children(self.ROOT_INDEX) if not self.income_flags[index]]
+
+    def get_linked_amount(self, index: int) -> float:
+        """Get the sum of the amounts of the child nodes of a node."""
+        return self.linked_amounts[index] / 100
+
+    def get_content_hash(self) -> str:
+        """Get a stable hash of the structure, amounts and labels of the tree."""
+        digest = hashlib.blake2b(digest_size=16)
+        for values in (self.parents, self.amounts, self.label_ids, self.income_flags):
+            digest.update(len(values).to_bytes(8, 'little'))
+            digest.update(values.tobytes())
+        for label in self.label_table:
+            encoded_label = str(label).encode('utf-8')
+            digest.update(len(encoded_label).to_bytes(8, 'little'))
+            digest.update(encoded_label)
+        return digest.hexdigest()
+
+    def get_income_cents(self) -> int:
+        """Get the total amount of income in cents."""
+        return self.income_cents
+
+    def get_issues_cents(self) -> int:
+        """Get the total amount of the top level issues in cents."""
+        return self.issues_cents
+
+    def get_income_amount(self) -> float:
+        """Get the total amount of income."""
+        return self.get_income_cents() / 100
+
+    def get_issues_amount(self) -> float:
+        """Get the total amount of issues."""
+        return self.get_issues_cents() / 100
+
+    def get_unused_income_amount(self) -> float:
+        """Get the income not covered by issues. It is negative if more is spent than earned."""
+        return (self.income_cents - self.issues_cents) / 100
+
+
+class SankeyTreeNode:
+    """SankeyNode compatible read-only view of a node of a SankeyTree."""
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: SankeyTree, index: int):
+        """Initialize the view."""
+        self.tree: SankeyTree = tree
+        self.index: int = index
+
+    @property
+    def label(self) -> str:
+        """Get the label of the node."""
+        return self.tree.get_label(self.index)
+
+    @property
+    def amount(self) -> float:
+        """Get the amount of the node."""
+        return self.tree.get_amount(self.index)
+
+    @property
+    def linkedNodes(self) -> list['SankeyTreeNode']:
+        """Get views of the child nodes."""
+        return [SankeyTreeNode(self.tree, index) for index in self.tree.get_children(self.index)]
+
+    def get_linked_amount(self) -> float:
+        """Get the sum of the amounts of the linked nodes."""
+        return self.tree.get_linked_amount(self.index)
+
+    def get_unlinked_amount(self) -> float:
+        """Get the part of the amount that is not covered by linked nodes, e.g. for an 'other' node."""
+        return self.amount - self.get_linked_amount()
@@ -0,0 +1,45 @@
+"""Running aggregates of the transactions shown in a Sankey diagram."""
+
+
+class TransactionAggregates:
+    """
+    Signed sums in cents needed to build a Sankey diagram.
+
+    The sums are kept signed so aggregates of several parts of a file (e.g. chunks) can be folded together before the absolute amounts are taken.
+    """
+
+    def __init__(self, income_labels: list[str]):
+        """Initialize empty aggregates."""
+        self.income_total: int = 0
+        self.income_label_sums: dict[str, int] = {label: 0 for label in income_labels}
+        # hierarchy path of the deepest issue level -> sum
+        self.issue_sums: dict[tuple, int] = {}
+        # hierarchy path of the deepest issue level -> index of its first row in the file
+        self.issue_first_rows: dict[tuple, int] = {}
+
+    def add_income_total(self, amount: int) -> None:
+        """Add to the total of all income rows."""
+        self.income_total += int(amount)
+
+    def add_income_label_sums(self, label_sums: dict[str, int]) -> None:
+        """Add the sums of the income labels."""
+        for label, amount in label_sums.items():
+            self.income_label_sums[label] = self.income_label_sums.get(label, 0) + int(amount)
+
+    def add_issue_sums(self, issue_sums: dict[tuple, int], issue_first_rows: dict[tuple, int]) -> None:
+        """Add the sums of the issue hierarchy paths together with the index of their first row."""
+        for path, amount in issue_sums.items():
+            self.issue_sums[path] = self.issue_sums.get(path, 0) + int(amount)
+        for path, first_row in issue_first_rows.items():
+            if first_row < self.issue_first_rows.get(path, first_row + 1):
+                self.issue_first_rows[path] = int(first_row)
+
+    def get_issue_sums_in_file_order(self) -> dict[tuple, int]:
+        """Get the issue sums in order of the first row of every path, independent of the order the parts were folded in (e.g. months)."""
+        return {path: self.issue_sums[path] for path in sorted(self.issue_sums, key=self.issue_first_rows.__getitem__)}
+
+    def add(self, other: 'TransactionAggregates') -> None:
+        """Fold other aggregates into these aggregates."""
+        self.add_income_total(other.income_total)
+        self.add_income_label_sums(other.income_label_sums)
+        self.add_issue_sums(other.issue_sums, other.issue_first_rows)
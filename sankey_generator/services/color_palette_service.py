@@ -0,0 +1,41 @@
+"""Deterministic colors for the nodes and links of the Sankey diagram."""
+
+import colorsys
+import hashlib
+from sankey_generator.models.theme import Theme
+
+
+class ColorPaletteService:
+    """
+    Assign colors to labels by hashing them, so the same data is always drawn in the same colors.
+
+    The lightness depends on the current theme, so colors stay readable on dark and light backgrounds. Assigned colors are cached per theme.
+    """
+
+    DARK_MODE_LIGHTNESS = 0.62
+    LIGHT_MODE_LIGHTNESS = 0.42
+
+    def __init__(self):
+        """Initialize the palette with an empty cache."""
+        self.colors: dict[tuple[bool, str], str] = {}
+
+    def _create_color(self, label: str, dark_mode: bool) -> str:
+        """Create the color of a label from a stable hash of the label."""
+        value = int.from_bytes(hashlib.blake2b(label.encode('utf-8'), digest_size=4).digest(), 'big')
+        hue = (value % 360) / 360
+        saturation = 0.5 + ((value >> 9) % 30) / 100
+        lightness = self.DARK_MODE_LIGHTNESS if dark_mode else self.LIGHT_MODE_LIGHTNESS
+        red, green, blue = colorsys.hls_to_rgb(hue, lightness, saturation)
+        return '#%02x%02x%02x' % (round(red * 255), round(green * 255), round(blue * 255))
+
+    def get_color(self, label: str) -> str:
+        """Get the color of a label for the current theme."""
+        key = (Theme.dark_mode, label)
+        color = self.colors.get(key)
+        if color is None:
+            color = self.colors[key] = self._create_color(label, Theme.dark_mode)
+        return color
+
+    def get_colors(self, labels: list[str]) -> list[str]:
+        """Get the colors of many labels for the current theme."""
+        return [self.get_color(label) for label in labels]
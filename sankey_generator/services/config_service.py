@@ -2,6 +2,7 @@
 
 import json
 from sankey_generator.models.config import Config, DataFrameFilter, AccountSource, IssueCategory, IncomeFilter
+from sankey_generator.utils.config_writer import ConfigWriter
 import os
 
 
@@ -9,7 +10,9 @@ class ConfigService:
     """Store the configuration data for the Sankey Generator."""
 
     def __init__(self, config_file):
-        """Initialize the configuration data."""
+        """Initialize the configuration data. Changes are written to the config file behind, bursts of changes are written once."""
+        self.config_file: str = config_file
+        self.config_writer: ConfigWriter = ConfigWriter(config_file)
         # chek if the config file exists
         if not os.path.exists(config_file):
             # create a default config file
@@ -30,9 +33,9 @@ class ConfigService:
                 'last_used_year': 0,
                 'last_used_issue_level': 0,
                 'dark_mode': False,
+                'streaming_chunk_size': 0,
             }
-            with open(config_file, 'w') as file:
-                json.dump(default_config, file, indent=4)
+            self.config_writer.write_now(default_config)
 
         with open(config_file, 'r') as file:
             config_data = json.load(file)
@@ -54,6 +57,7 @@ class ConfigService:
             last_used_year=config_data['last_used_year'],
             last_used_issue_level=config_data['last_used_issue_level'],
             dark_mode=config_data['dark_mode'],
+            streaming_chunk_size=config_data.get('streaming_chunk_size', 0),
         )
 
     def _parseDataFrameFilter(self, issues_data_frame_filter: dict) -> DataFrameFilter:
@@ -89,9 +93,12 @@ class ConfigService:
         return issue_category
 
     def _save_config(self):
-        """Save the configuration data to the config file."""
-        with open('config.json', 'w') as file:
-            json.dump(self.config.to_dict(), file, indent=4)
+        """Save the configuration data to the config file, after a short delay."""
+        self.config_writer.write(self.config.to_dict())
+
+    def flush_config(self) -> None:
+        """Write pending changes to the config file now."""
+        self.config_writer.flush()
 
     def _save_string_value(self, key: str, new_value: str) -> None:
         """Save a string value to the config file."""
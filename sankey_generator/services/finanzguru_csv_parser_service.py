@@ -1,14 +1,27 @@
 """Finanzguru CSV parser."""
 
+import numpy as np
 import pandas as pd
-from sankey_generator.models.sankey_node import SankeyNode
-from sankey_generator.models.sankey_income_node import SankeyRootNode
+from sankey_generator.models.sankey_tree import SankeyTree
 from sankey_generator.models.config import DataFrameFilter, AccountSource, IssueCategory
+from sankey_generator.models.period import Period
+from sankey_generator.models.transaction_aggregates import TransactionAggregates
+from sankey_generator.services.issue_aggregation_service import IssueAggregationService
+from sankey_generator.utils.data_frame_cache import DataFrameCache
+from sankey_generator.utils.data_frame_filter_engine import DataFrameFilterEngine
+from sankey_generator.utils.file_identity import FileIdentity
+from sankey_generator.utils.income_filter_matcher import IncomeFilterMatcher
+from sankey_generator.utils.period_index import PeriodIndex
+from sankey_generator.utils.rollup_cube import RollupCube
+from sankey_generator.utils.sidecar_cache import SidecarCache
 
 
 class FinanzguruCsvParserService:
     """Finanzguru CSV parser."""
 
+    # Column added at load time holding the amount as integer cents
+    AMOUNT_CENTS_COLUMN_NAME = 'amount_cents'
+
     def __init__(
         self,
         issues_hierarchy: IssueCategory,
@@ -27,120 +40,173 @@ class FinanzguruCsvParserService:
         self.amount_out_name = amount_out_name
         self.other_income_name = other_income_name
         self.not_used_income_name = not_used_income_name
+        self.transaction_cache: DataFrameCache = DataFrameCache()
+        self.sidecar_cache: SidecarCache = SidecarCache()
+        self.period_index: PeriodIndex = None
+        self.rollup_cube: RollupCube = None
+        self.data_frame_filter_engine: DataFrameFilterEngine = DataFrameFilterEngine()
+        self.issue_aggregation_service: IssueAggregationService = IssueAggregationService()
+        self.income_filter_matcher: IncomeFilterMatcher = None
+        self.streaming_chunk_size: int = 0
 
-    def _get_sum(self, df: pd.DataFrame) -> float:
-        """Return the sum of column in the DataFrame."""
-        df = df.str.replace('.', '').str.replace(',', '.').astype(float)
-        sum = df.sum()
-        if sum < 0:
-            sum = sum * -1
-        return sum
-
-    def _get_sum_for_value_in_column(self, df: pd.DataFrame, column: str, values_filter: list[str]) -> float:
-        """Return the sum of the column in the DataFrame where the 'column' contains 'value_lowercase'."""
-        sum = 0
-        for value in values_filter:
-            filtered_df = df.loc[(df[column].str.lower().str.contains(value.lower())), self.amount_out_name]
-            sum = sum + self._get_sum(filtered_df)
-        return sum
-
-    def _get_relevant_data_from_csv(
-        self,
-        file_path: str,
-        year: int,
-        month: int,
-    ) -> pd.DataFrame:
-        """Get relevant data from the Finanzguru CSV file."""
-        df = pd.read_csv(file_path, sep=';', decimal=',')
+    def _get_amount_cents(self, df: pd.DataFrame) -> pd.Series:
+        """Convert the amount column to integer cents."""
+        if pd.api.types.is_numeric_dtype(df):
+            amounts = df
+        else:
+            amounts = pd.to_numeric(df.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+        return (amounts * 100).round().astype('int64')
+
+    def _get_category_column_names(self) -> list[str]:
+        """Get the low cardinality columns used for filtering and grouping. They are read as categories."""
+        column_names: list[str] = [self.analysis_month_column_name]
+        for data_frame_filter in self.income_data_frame_fitlers + self.issues_data_frame_fitlers:
+            column_names.append(data_frame_filter.csv_column_name)
+        if self.issues_hierarchy is not None:
+            column_names += self.issues_hierarchy.get_column_names()
+        return [column_name for column_name in dict.fromkeys(column_names) if column_name]
+
+    def _get_column_names(self) -> list[str]:
+        """Get all columns referenced by the configuration. Other columns of the export are not read."""
+        column_names: list[str] = [self.analysis_year_column_name, self.amount_out_name]
+        for income_source in self.income_sources:
+            for income_filter in income_source.income_filters:
+                column_names.append(income_filter.csv_column_name)
+        column_names += self._get_category_column_names()
+        return [column_name for column_name in dict.fromkeys(column_names) if column_name]
+
+    def _get_read_csv_options(self) -> dict:
+        """Get the options for reading only the referenced columns with compact dtypes."""
+        column_names = set(self._get_column_names())
+        return {
+            'sep': ';',
+            'decimal': ',',
+            # Missing columns are not an error here, they fail with a clear KeyError where they are used
+            'usecols': lambda column_name: column_name in column_names,
+            'dtype': {column_name: 'category' for column_name in self._get_category_column_names()},
+        }
+
+    def _get_read_csv_variant(self) -> tuple:
+        """Get a hashable description of the columns and dtypes read from the file."""
+        return (tuple(self._get_column_names()), tuple(self._get_category_column_names()))
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fill empty cells and normalize the amounts of freshly read rows to cents."""
+        # categories only accept known values, so "empty" has to be added before filling
+        for column_name in df.select_dtypes('category').columns:
+            if 'empty' not in df[column_name].cat.categories:
+                df[column_name] = df[column_name].cat.add_categories('empty')
 
         # fill all empty cells in each column with "empty"
         df = df.fillna('empty')
 
-        if month is None:
-            df = df.loc[(df[self.analysis_year_column_name] == year)]
-        else:
-            df = df.loc[(df[self.analysis_month_column_name] == f'{year}-{month:02d}')]
+        df[self.AMOUNT_CENTS_COLUMN_NAME] = self._get_amount_cents(df[self.amount_out_name])
+        # the amount strings are not needed anymore once the cents are known
+        return df.drop(columns=[self.amount_out_name])
 
+    def _read_csv(self, file_path: str) -> pd.DataFrame:
+        """Read the referenced columns of the whole Finanzguru CSV file."""
+        return self._normalize(pd.read_csv(file_path, **self._get_read_csv_options()))
+
+    def _load_transactions(self, file_path: str, identity: FileIdentity) -> pd.DataFrame:
+        """Load the normalized transactions from the sidecar cache if it is valid, otherwise from the CSV file."""
+        variant = self._get_read_csv_variant()
+        df = self.sidecar_cache.load(file_path, identity, variant)
+        if df is None:
+            df = self._read_csv(file_path)
+            self.sidecar_cache.save(file_path, df, identity, variant)
         return df
 
-    def _create_income_nodes(self, df: pd.DataFrame, income_accounts: list[AccountSource]) -> list[SankeyNode]:
-        """Create income nodes from the income DataFrame and income sources."""
-        income_df: pd.DataFrame = df
-        for data_frame_filter in self.income_data_frame_fitlers:
-            income_df = income_df.loc[df[data_frame_filter.csv_column_name].isin(data_frame_filter.csv_value_filters)]
+    def _get_period_index(self, file_path: str) -> PeriodIndex:
+        """Get the period index of the loaded transactions, rebuilt only if the transactions were reloaded."""
+        df = self.transaction_cache.get(file_path, self._load_transactions, self._get_read_csv_variant())
+        if self.period_index is None or self.period_index.df is not df:
+            self.period_index = PeriodIndex(df, self.analysis_year_column_name, self.analysis_month_column_name)
+        return self.period_index
 
-        income_nodes: list[SankeyNode] = []
-        for income_source in income_accounts:
-            for income_filter in income_source.income_filters:
-                sum = self._get_sum_for_value_in_column(
-                    income_df, income_filter.csv_column_name, income_filter.csv_value_filters
-                )
-                income_nodes.append(SankeyNode(sum, income_filter.sankey_label))
+    def _get_income_filter_matcher(self, income_accounts: list[AccountSource]) -> IncomeFilterMatcher:
+        """Get the compiled matcher for the income filters, recompiled only if the filters changed."""
+        signature = IncomeFilterMatcher.get_signature(income_accounts)
+        if self.income_filter_matcher is None or self.income_filter_matcher.signature != signature:
+            self.income_filter_matcher = IncomeFilterMatcher(income_accounts)
+        return self.income_filter_matcher
 
-        # add other income to income_nodes
-        sum_other_income = self._get_sum(income_df[self.amount_out_name])
-        for node in income_nodes:
-            sum_other_income -= node.amount
+    def _aggregate_by_month(self, df: pd.DataFrame, month_keys: np.ndarray, hierarchy_columns: list[str]) -> dict[int, TransactionAggregates]:
+        """Aggregate the income and issue sums of the DataFrame per month in one grouped pass each. 'month_keys' holds the month key of every row."""
+        income_filter_matcher = self._get_income_filter_matcher(self.income_sources)
+        month_aggregates: dict[int, TransactionAggregates] = {}
 
-        income_nodes.append(SankeyNode(sum_other_income, self.other_income_name))
-        return income_nodes
+        def get_month_aggregates(month_key) -> TransactionAggregates:
+            month_key = int(month_key)
+            if month_key not in month_aggregates:
+                month_aggregates[month_key] = TransactionAggregates(income_filter_matcher.labels)
+            return month_aggregates[month_key]
 
-    def _create_all_issue_nodes(
-        self,
-        df: pd.DataFrame,
-        issue_category: IssueCategory,
-        used_category_names: list[str],
-        issue_depth: int,
-    ) -> list[SankeyNode]:
-        """Create all issue nodes from the issues DataFrame and main categories."""
-        issues_df: pd.DataFrame = df
-        for data_frame_filter in self.issues_data_frame_fitlers:
-            issues_df = issues_df.loc[df[data_frame_filter.csv_column_name].isin(data_frame_filter.csv_value_filters)]
-
-        return self._create_issue_nodes(
-            issues_df,
-            issue_category,
-            used_category_names,
-            issue_depth,
-        )
+        income_mask = self.data_frame_filter_engine.get_mask(df, self.income_data_frame_fitlers)
+        income_df = df.loc[income_mask]
+        income_keys = pd.Series(month_keys[income_mask], index=income_df.index)
+        income_amounts = income_df[self.AMOUNT_CENTS_COLUMN_NAME]
+        for month_key, amount in income_amounts.groupby(income_keys, sort=False).sum().items():
+            get_month_aggregates(month_key).add_income_total(amount)
+        for (month_key, label), amount in income_amounts.groupby([income_keys, income_filter_matcher.classify(income_df)], sort=False).sum().items():
+            get_month_aggregates(month_key).add_income_label_sums({label: amount})
 
-    def _create_issue_nodes(
-        self,
-        issues_df: pd.DataFrame,
-        issue_category: IssueCategory,
-        used_category_names: list[str],
-        issue_depth: int,
-    ) -> list[SankeyNode]:
-        """Create issue nodes from the issues DataFrame and main categories."""
-        issue_nodes: list[SankeyNode] = []
-        if issue_category is None:
-            return issue_nodes
-        if issue_depth < 1:
-            return issue_nodes
+        issues_mask = self.data_frame_filter_engine.get_mask(df, self.issues_data_frame_fitlers)
+        issues_df = df.loc[issues_mask]
+        if len(hierarchy_columns) > 0 and not issues_df.empty:
+            issue_keys = pd.Series(month_keys[issues_mask], index=issues_df.index)
+            issue_sums = self.issue_aggregation_service.aggregate(issues_df, issues_df[self.AMOUNT_CENTS_COLUMN_NAME], hierarchy_columns, issue_keys)
+            for (month_key, *path), amount, first_row in issue_sums.itertuples():
+                get_month_aggregates(month_key).add_issue_sums({tuple(path): amount}, {tuple(path): first_row})
 
-        issues_current_category = issues_df[issue_category.csv_column_name].unique()
-        for category in issues_current_category:
-            sum = self._get_sum_for_value_in_column(issues_df, issue_category.csv_column_name, [category])
+        return month_aggregates
 
-            if category in used_category_names:
-                # add a invisible space to the category name to avoid circular reference
-                category = f' {category}'
+    def _aggregate_csv_in_chunks(self, file_path: str, period: Period, hierarchy_columns: list[str]) -> dict[int, TransactionAggregates]:
+        """Stream the Finanzguru CSV file in chunks and fold the monthly aggregates of the rows of the requested period."""
+        month_aggregates: dict[int, TransactionAggregates] = {}
+        with pd.read_csv(file_path, chunksize=self.streaming_chunk_size, **self._get_read_csv_options()) as reader:
+            for chunk in reader:
+                chunk = self._normalize(chunk)
+                month_keys = PeriodIndex.get_period_keys(chunk, self.analysis_year_column_name, self.analysis_month_column_name)
+                in_period = (month_keys >= period.start_key) & (month_keys <= period.end_key)
+                if not in_period.any():
+                    continue
+                for month_key, aggregates in self._aggregate_by_month(chunk.loc[in_period], month_keys[in_period], hierarchy_columns).items():
+                    if month_key in month_aggregates:
+                        month_aggregates[month_key].add(aggregates)
+                    else:
+                        month_aggregates[month_key] = aggregates
+        return month_aggregates
 
-            current_category_node = SankeyNode(sum, category)
+    def _get_filter_signature(self) -> tuple:
+        """Get a hashable description of everything that changes the aggregates of a dataset."""
+        return (
+            IncomeFilterMatcher.get_signature(self.income_sources),
+            tuple((data_frame_filter.csv_column_name, tuple(data_frame_filter.csv_value_filters)) for data_frame_filter in self.income_data_frame_fitlers),
+            tuple((data_frame_filter.csv_column_name, tuple(data_frame_filter.csv_value_filters)) for data_frame_filter in self.issues_data_frame_fitlers),
+            tuple(self.issues_hierarchy.get_column_names()),
+        )
 
-            category_df = issues_df.loc[
-                issues_df[issue_category.csv_column_name].str.lower().str.contains(category.lower())
-            ]
+    def _get_rollup_cube(self) -> RollupCube:
+        """Get the monthly aggregates of the whole dataset, recomputed only if the file or the filters changed."""
+        period_index = self._get_period_index(self.file_path)
+        signature = self._get_filter_signature()
+        if self.rollup_cube is None or not self.rollup_cube.is_valid_for(signature, period_index):
+            hierarchy_columns = self.issues_hierarchy.get_column_names()
+            month_aggregates = self._aggregate_by_month(period_index.df, period_index.keys, hierarchy_columns)
+            self.rollup_cube = RollupCube(signature, period_index, self._get_income_filter_matcher(self.income_sources).labels, month_aggregates)
+        return self.rollup_cube
 
-            used_category_names.append(category)
-            sub_nodes = self._create_issue_nodes(
-                category_df, issue_category.sub_category, used_category_names, issue_depth - 1
-            )
-            for sub_node in sub_nodes:
-                current_category_node.add_linked_node(sub_node)
+    def _append_income_nodes(self, sankey_tree: SankeyTree, aggregates: TransactionAggregates) -> None:
+        """Append income nodes from the aggregated income sums."""
+        # add other income to income nodes
+        sum_other_income = abs(aggregates.income_total)
+        for label, sum in aggregates.income_label_sums.items():
+            sum = abs(sum)
+            sum_other_income -= sum
+            sankey_tree.append_income(label, sum)
 
-            issue_nodes.append(current_category_node)
-        return issue_nodes
+        sankey_tree.append_income(self.other_income_name, sum_other_income)
 
     def configure_parser(
         self,
@@ -148,47 +214,86 @@ class FinanzguruCsvParserService:
         income_sources: list[AccountSource],
         income_data_frame_fitlers: list[DataFrameFilter],
         issues_data_frame_fitlers: list[DataFrameFilter],
+        streaming_chunk_size: int = 0,
     ) -> None:
-        """Configure the parser."""
+        """Configure the parser. A 'streaming_chunk_size' greater than 0 reads the file in chunks of that many rows instead of loading it at once."""
         self.file_path = file_path
         self.income_sources = income_sources
         self.income_data_frame_fitlers = income_data_frame_fitlers
         self.issues_data_frame_fitlers = issues_data_frame_fitlers
+        self.streaming_chunk_size = streaming_chunk_size
 
     def parse_csv(
         self,
         year: int,
         month: int,
         issue_depth: int,
-    ) -> SankeyRootNode:
-        """Parse the Finanzguru CSV file and return a DataFrame."""
+    ) -> SankeyTree:
+        """Parse the Finanzguru CSV file for a month, or for the whole year if 'month' is None."""
+        if month is not None:
+            if self.analysis_month_column_name is None:
+                raise ValueError('analysis_month_column_name must be set if month is not None')
+
+        return self.parse_period(Period.year(year) if month is None else Period.month(year, month), issue_depth)
+
+    def parse_period(
+        self,
+        period: Period,
+        issue_depth: int,
+    ) -> SankeyTree:
+        """Parse the Finanzguru CSV file for an arbitrary range of months, e.g. a quarter or the last 12 months."""
+        return self.parse_periods([period], issue_depth)[0]
+
+    def parse_periods(
+        self,
+        periods: list[Period],
+        issue_depth: int,
+    ) -> list[SankeyTree]:
+        """
+        Parse the Finanzguru CSV file for many periods at once and return one Sankey tree per period.
+
+        The periods are folded from the monthly sums of the rollup cube. The rows are only aggregated again if the file or the filters changed,
+        trees already built from the cube are returned again. The trees must therefore not be modified.
+        In streaming mode the rows covering all periods are aggregated per month while reading the file.
+        """
         if issue_depth < 1:
             raise ValueError('issue_level must be greater than 0')
         max_issue_level = self.issues_hierarchy.get_depth()
         if issue_depth > max_issue_level:
             raise ValueError(f'issue_level must be less than or equal to {max_issue_level}')
-        if month is not None:
-            if self.analysis_month_column_name is None:
-                raise ValueError('analysis_month_column_name must be set if month is not None')
+        if len(periods) == 0:
+            return []
 
-        df: pd.DataFrame = self._get_relevant_data_from_csv(
-            self.file_path,
-            year,
-            month,
-        )
+        hierarchy_columns = self.issue_aggregation_service.get_hierarchy_columns(self.issues_hierarchy, issue_depth)
+        if self.streaming_chunk_size:
+            covering_period = Period.from_keys(min(period.start_key for period in periods), max(period.end_key for period in periods))
+            month_aggregates = self._aggregate_csv_in_chunks(self.file_path, covering_period, hierarchy_columns)
+            rollup_cube = RollupCube(None, None, self._get_income_filter_matcher(self.income_sources).labels, month_aggregates)
+        else:
+            rollup_cube = self._get_rollup_cube()
+
+        sankey_trees: list[SankeyTree] = []
+        for period in periods:
+            tree_key = (period, len(hierarchy_columns))
+            sankey_tree = rollup_cube.sankey_trees.get(tree_key)
+            if sankey_tree is None:
+                sankey_tree = rollup_cube.sankey_trees[tree_key] = self._create_sankey_tree(rollup_cube.get_period_aggregates(period), len(hierarchy_columns))
+            sankey_trees.append(sankey_tree)
+        return sankey_trees
 
-        root_node = SankeyRootNode(self.income_node_name)
+    def _create_sankey_tree(self, aggregates: TransactionAggregates, hierarchy_depth: int) -> SankeyTree:
+        """Create the Sankey tree from the aggregated sums."""
+        sankey_tree = SankeyTree(self.income_node_name)
 
-        root_node.add_incomes(self._create_income_nodes(df, self.income_sources))
+        self._append_income_nodes(sankey_tree, aggregates)
 
         # We need to know all used category names because sankey plot will add a circular reference if node name is ussed multiple times
-        used_category_names: list[str] = []
-        root_node.add_issues(self._create_all_issue_nodes(df, self.issues_hierarchy, used_category_names, issue_depth))
+        used_category_names: set[str] = set()
+        self.issue_aggregation_service.append_issue_nodes(sankey_tree, aggregates.get_issue_sums_in_file_order(), hierarchy_depth, used_category_names)
 
         # not used income
-        unused_income = root_node.get_income_amount() - root_node.get_issues_amount()
+        unused_income = sankey_tree.get_income_cents() - sankey_tree.get_issues_cents()
         if unused_income > 0:
-            unused_income_node = SankeyNode(unused_income, self.not_used_income_name)
-            root_node.add_issue(unused_income_node)
+            sankey_tree.append_issue(self.not_used_income_name, unused_income)
 
-        return root_node
+        return sankey_tree
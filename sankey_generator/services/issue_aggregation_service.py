@@ -0,0 +1,62 @@
+"""Aggregation of issue amounts along the issue hierarchy."""
+
+import pandas as pd
+from sankey_generator.models.sankey_tree import SankeyTree
+from sankey_generator.models.config import IssueCategory
+
+
+class IssueAggregationService:
+    """
+    Build the issue tree from a single groupby over the hierarchy columns.
+
+    Categories are matched exactly. The rows are grouped once on the deepest requested level and the sums of the upper levels are rolled up from the groups,
+    so the cost grows with the number of rows and not with the number of categories.
+    """
+
+    def get_hierarchy_columns(self, issue_category: IssueCategory, issue_depth: int) -> list[str]:
+        """Get the csv column names of the first 'issue_depth' levels of the issue hierarchy."""
+        columns: list[str] = []
+        while issue_category is not None and len(columns) < issue_depth:
+            columns.append(issue_category.csv_column_name)
+            issue_category = issue_category.sub_category
+        return columns
+
+    def aggregate(self, issues_df: pd.DataFrame, amounts: pd.Series, hierarchy_columns: list[str], leading_keys: pd.Series = None) -> pd.DataFrame:
+        """
+        Return the signed sums in cents ('amount') and the index of the first row ('first_row') grouped by the hierarchy columns in order of first appearance.
+
+        If 'leading_keys' is given (e.g. the month of every row), it is used as first group level before the hierarchy columns.
+        """
+        keys = [issues_df[column] for column in hierarchy_columns]
+        if leading_keys is not None:
+            keys.insert(0, leading_keys)
+        rows = pd.DataFrame({'amount': amounts, 'first_row': issues_df.index.to_numpy()}, index=issues_df.index)
+        return rows.groupby(keys, sort=False, dropna=False, observed=True).agg({'amount': 'sum', 'first_row': 'min'})
+
+    def append_issue_nodes(self, sankey_tree: SankeyTree, sums: dict[tuple, int], hierarchy_depth: int, used_category_names: set[str]) -> None:
+        """Append the issue nodes built from the grouped sums in cents of the deepest hierarchy level to the Sankey tree."""
+        # Each tree entry maps a category to its signed sum and the tree of its sub categories
+        tree: dict = {}
+        for key, amount in sums.items():
+            path = key if isinstance(key, tuple) else (key,)
+            level = tree
+            for category in path[:hierarchy_depth]:
+                entry = level.get(category)
+                if entry is None:
+                    entry = level[category] = [0, {}]
+                entry[0] += amount
+                level = entry[1]
+
+        self._append_nodes(sankey_tree, SankeyTree.ROOT_INDEX, tree, used_category_names)
+
+    def _append_nodes(self, sankey_tree: SankeyTree, parent_index: int, tree: dict, used_category_names: set[str]) -> None:
+        """Append the nodes of one tree level, depth first like the nodes are named in the diagram."""
+        for category, (amount, sub_tree) in tree.items():
+            label = category
+            if label in used_category_names:
+                # add a invisible space to the category name to avoid circular reference
+                label = f' {label}'
+            used_category_names.add(label)
+
+            node_index = sankey_tree.append_issue(label, abs(int(amount)), parent_index)
+            self._append_nodes(sankey_tree, node_index, sub_tree, used_category_names)
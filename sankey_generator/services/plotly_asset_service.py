@@ -0,0 +1,56 @@
+"""The plotly.js bundle shared by all rendered diagrams."""
+
+import json
+
+
+class PlotlyAssetService:
+    """
+    Provide the plotly.js bundle once from memory, so diagram pages can load it by URL instead of inlining it.
+
+    The file name of the bundle contains the plotly version, so after an update of plotly the web engine never uses a stale bundle.
+    The service also provides the diagram shell: an empty diagram div with a warmed up plotly runtime, ready to receive figure data.
+    """
+
+    DIAGRAM_DIV_ID = 'sankey-diagram'
+
+    def __init__(self):
+        """Initialize the service. The bundle is read on first use."""
+        self.plotly_js_bytes: bytes = None
+
+    def get_plotly_js_file_name(self) -> str:
+        """Get the file name of the plotly.js bundle of the installed plotly version."""
+        # the version is read from the package metadata, importing plotly takes too long at startup
+        from importlib import metadata
+
+        return f'plotly-{metadata.version("plotly")}.min.js'
+
+    def get_plotly_js(self) -> str:
+        """Get the content of the plotly.js bundle."""
+        from plotly.offline import get_plotlyjs
+
+        return get_plotlyjs()
+
+    def get_plotly_js_bytes(self) -> bytes:
+        """Get the plotly.js bundle encoded as UTF-8, read only once."""
+        if self.plotly_js_bytes is None:
+            self.plotly_js_bytes = self.get_plotly_js().encode('utf-8')
+        return self.plotly_js_bytes
+
+    def get_diagram_shell(self, background_color: str) -> str:
+        """
+        Get the HTML of an empty diagram. The figure data is pushed in later with Plotly.react.
+
+        Plotting an empty sankey trace makes the web engine parse plotly.js and run the sankey code once, before the first real diagram arrives.
+        """
+        div_id = json.dumps(self.DIAGRAM_DIV_ID)
+        layout = json.dumps({'paper_bgcolor': background_color, 'plot_bgcolor': background_color})
+        empty_trace = '{type: "sankey", node: {label: []}, link: {source: [], target: [], value: []}}'
+        diagram_div = f'<div style="height:100%; width:100%;"><div id={div_id} class="plotly-graph-div" style="height:100%; width:100%;"></div></div>'
+        return f'{diagram_div}<script>if (window.Plotly) {{ Plotly.newPlot({div_id}, [{empty_trace}], {layout}, {{responsive: true}}); }}</script>'
+
+    def get_background_script(self, background_color: str) -> str:
+        """Get a JavaScript snippet which sets the background of the page and of its diagram."""
+        div_id = json.dumps(self.DIAGRAM_DIV_ID)
+        layout = json.dumps({'paper_bgcolor': background_color, 'plot_bgcolor': background_color})
+        set_page_background = f'document.body.style.backgroundColor = {json.dumps(background_color)};'
+        return f'{set_page_background} if (window.Plotly && document.getElementById({div_id})) {{ Plotly.relayout({div_id}, {layout}); }}'
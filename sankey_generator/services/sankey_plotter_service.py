@@ -1,89 +1,122 @@
 """SankeyPlotter class."""
 
+import hashlib
+import json
+import numpy as np
 import plotly.graph_objects as go
-import random
 import plotly.io as pio
 
 from sankey_generator.models.sankey_income_node import SankeyRootNode
 from sankey_generator.models.sankey_node import SankeyNode
+from sankey_generator.models.sankey_tree import SankeyTree
 from sankey_generator.models.theme import Theme
+from sankey_generator.services.color_palette_service import ColorPaletteService
+from sankey_generator.services.plotly_asset_service import PlotlyAssetService
+from sankey_generator.utils.lru_byte_cache import LruByteCache
 
 
 class SankeyPlotterService:
     """SankeyPlotter class."""
 
-    def __init__(self, amount_out_name: str):
-        """Initialize the SankeyPlotter."""
+    DIAGRAM_DIV_ID = PlotlyAssetService.DIAGRAM_DIV_ID
+    RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, amount_out_name: str, include_plotlyjs: bool = False):
+        """
+        Initialize the SankeyPlotter.
+
+        With 'include_plotlyjs' every HTML div embeds the plotly.js bundle. Otherwise the page showing the div has to load plotly.js once itself.
+        """
         self.amount_out_name = amount_out_name
+        self.include_plotlyjs = include_plotlyjs
+        self.color_palette_service: ColorPaletteService = ColorPaletteService()
+        self.render_cache: LruByteCache = LruByteCache(self.RENDER_CACHE_MAX_BYTES)
+
+    def _get_node_index(self, label: str, labels: list[str], label_indexes: dict[str, int]) -> int:
+        """Get the index of the diagram node with the given label, adding the node if the label is new."""
+        node_index = label_indexes.get(label)
+        if node_index is None:
+            node_index = label_indexes[label] = len(labels)
+            labels.append(label)
+        return node_index
 
     def _add_nodes_to_sankey(
         self,
-        node: SankeyNode,
+        nodes: list[SankeyNode],
+        parent_index: int,
         labels: list[str],
+        label_indexes: dict[str, int],
         source: list[int],
         target: list[int],
         values: list[float],
-        colors: list[int],
-        parent_index=None,
+        link_labels: list[str],
     ) -> None:
-        """Add nodes to the sankey diagram."""
-        if node.label not in labels:
-            labels.append(node.label)
-        node_index = labels.index(node.label)
+        """Add nodes and all their linked nodes below the parent to the sankey diagram, depth first without recursion."""
+        stack: list[tuple[SankeyNode, int]] = [(node, parent_index) for node in reversed(nodes)]
+        while stack:
+            node, node_parent_index = stack.pop()
+            node_index = self._get_node_index(node.label, labels, label_indexes)
 
-        if parent_index is not None:
-            source.append(parent_index)
+            source.append(node_parent_index)
             target.append(node_index)
             values.append(node.amount)
-            colors.append('#%06x' % random.randint(0, 0xFFFFFF))
+            link_labels.append(node.label)
 
-        for issueNode in node.linkedNodes:
-            self._add_nodes_to_sankey(issueNode, labels, source, target, values, colors, node_index)
+            stack.extend((linked_node, node_index) for linked_node in reversed(node.linkedNodes))
 
     def _add_income_node_to_sankey(
         self,
         income_node: SankeyRootNode,
         labels: list[str],
+        label_indexes: dict[str, int],
         source: list[int],
         target: list[int],
         values: list[float],
-        colors: list[int],
-        parent_index=None,
+        link_labels: list[str],
     ) -> None:
         """Add income nodes to the sankey diagram."""
         for current_income in income_node.incomeNodes:
-            labels.append(current_income.label)
-            source.append(labels.index(current_income.label))
+            source.append(self._get_node_index(current_income.label, labels, label_indexes))
             values.append(current_income.amount)
-            # add random color
-            colors.append('#%06x' % random.randint(0, 0xFFFFFF))
+            link_labels.append(current_income.label)
 
-        labels.append(income_node.label)
-        income_node_index = len(labels) - 1
+        income_node_index = self._get_node_index(income_node.label, labels, label_indexes)
         target += [income_node_index] * len(income_node.incomeNodes)
 
-        if income_node.label not in labels:
-            labels.append(income_node.label)
-        node_index = labels.index(income_node.label)
-
-        if parent_index is not None:
-            source.append(parent_index)
-            target.append(node_index)
-            values.append(income_node.amount)
-            colors.append('#%06x' % random.randint(0, 0xFFFFFF))
-
-        for issueNode in income_node.issueNodes:
-            self._add_nodes_to_sankey(issueNode, labels, source, target, values, colors, node_index)
+        self._add_nodes_to_sankey(income_node.issueNodes, income_node_index, labels, label_indexes, source, target, values, link_labels)
+
+    def _get_sankey_tree_arrays(self, sankey_tree: SankeyTree) -> tuple[list[str], list[int], list[int], list[float], list[str]]:
+        """Get labels, sources, targets, values and the colors of the links of the sankey diagram directly from the arrays of the tree."""
+        parents = np.asarray(sankey_tree.parents, dtype=np.int64)[1:]
+        label_ids = np.asarray(sankey_tree.label_ids, dtype=np.int64)
+        income_flags = np.asarray(sankey_tree.income_flags, dtype=bool)[1:]
+        node_label_ids = label_ids[1:]
+
+        # income nodes flow into the root, issue nodes flow out of their parent
+        source = np.where(income_flags, node_label_ids, label_ids[parents])
+        target = np.where(income_flags, label_ids[SankeyTree.ROOT_INDEX], node_label_ids)
+        values = np.asarray(sankey_tree.amounts, dtype=np.int64)[1:] / 100
+        # a link has the color of the node it describes
+        label_colors = np.asarray(self.color_palette_service.get_colors(sankey_tree.label_table), dtype=object)
+        link_colors = label_colors[node_label_ids] if len(node_label_ids) > 0 else np.empty(0, dtype=object)
+        return list(sankey_tree.label_table), source.tolist(), target.tolist(), values.tolist(), link_colors.tolist()
+
+    def _get_sankey_arrays(self, income_node: SankeyRootNode | SankeyTree) -> tuple[list[str], list[int], list[int], list[float], list[str]]:
+        """Get labels, sources, targets, values and the colors of the links of the sankey diagram."""
+        if isinstance(income_node, SankeyTree):
+            return self._get_sankey_tree_arrays(income_node)
 
-    def _get_sankey_fig(self, income_node: SankeyRootNode, year: int, month: int) -> go.Figure:
-        """Get the sankey diagram Figure."""
         labels: list[str] = []
         source: list[int] = []
-        values: list[float] = []
-        colors: list[int] = []
         target: list[int] = []
+        values: list[float] = []
+        link_labels: list[str] = []
+        self._add_income_node_to_sankey(income_node, labels, {}, source, target, values, link_labels)
+        return labels, source, target, values, self.color_palette_service.get_colors(link_labels)
 
-        self._add_income_node_to_sankey(income_node, labels, source, target, values, colors)
+    def _get_sankey_fig(self, income_node: SankeyRootNode | SankeyTree, year: int, month: int) -> go.Figure:
+        """Get the sankey diagram Figure."""
+        labels, source, target, values, link_colors = self._get_sankey_arrays(income_node)
 
         fig = go.Figure(
             data=[
@@ -95,14 +128,14 @@ class SankeyPlotterService:
                         thickness=20,
                         line=dict(color='black', width=0.5),
                         label=labels,
-                        color=colors,
+                        color=self.color_palette_service.get_colors(labels),
                         hovertemplate=f'{self.amount_out_name} %{{value}}<extra></extra>',
                     ),
                     link=dict(
                         source=source,
                         target=target,
                         value=values,
-                        hovercolor=colors,
+                        hovercolor=link_colors,
                         hovertemplate=f'{self.amount_out_name}: %{{value}}<extra></extra>',
                     ),
                 )
@@ -122,7 +155,55 @@ class SankeyPlotterService:
 
         return fig
 
-    def get_sankey_html(self, income_node: SankeyRootNode, year: int, month: int) -> str:
-        """Plot the sankey diagram and return it as an HTML div."""
-        fig = self._get_sankey_fig(income_node, year, month)
-        return pio.to_html(fig, full_html=False)
+    def _get_content_hash(self, income_node: SankeyRootNode | SankeyTree) -> str:
+        """Get a stable hash of the labels, amounts and structure of the diagram data."""
+        if isinstance(income_node, SankeyTree):
+            return income_node.get_content_hash()
+
+        digest = hashlib.blake2b(digest_size=16)
+        stack: list[tuple[int, SankeyNode]] = [(1, node) for node in reversed(income_node.issueNodes)] + [(0, node) for node in reversed(income_node.incomeNodes)]
+        digest.update(repr(income_node.label).encode('utf-8'))
+        while stack:
+            depth, node = stack.pop()
+            digest.update(repr((depth, node.label, node.amount)).encode('utf-8'))
+            stack.extend((depth + 1, linked_node) for linked_node in reversed(node.linkedNodes))
+        return digest.hexdigest()
+
+    def _get_render_key(self, income_node: SankeyRootNode | SankeyTree, year: int, month: int) -> str:
+        """Get the render cache key of everything that changes the HTML of a diagram."""
+        settings = (year, month, Theme.dark_mode, sorted(Theme.get_colors().items()), self.amount_out_name, self.DIAGRAM_DIV_ID, self.include_plotlyjs)
+        return f'{self._get_content_hash(income_node)}-{hashlib.blake2b(repr(settings).encode("utf-8"), digest_size=16).hexdigest()}'
+
+    def get_sankey_html(self, income_node: SankeyRootNode | SankeyTree, year: int, month: int) -> str:
+        """Plot the sankey diagram and return it as an HTML div. Repeated renders of the same diagram are served from the render cache."""
+        render_key = self._get_render_key(income_node, year, month)
+        html = self.render_cache.get(render_key)
+        if html is None:
+            fig = self._get_sankey_fig(income_node, year, month)
+            # a fixed div id keeps the output of identical diagrams byte-identical
+            html = pio.to_html(fig, full_html=False, div_id=self.DIAGRAM_DIV_ID, include_plotlyjs=self.include_plotlyjs)
+            self.render_cache.put(render_key, html)
+        return html
+
+    def get_sankey_update_script(self, income_node: SankeyRootNode | SankeyTree, year: int, month: int) -> str:
+        """Get a JavaScript snippet which replaces data and layout of the diagram in an already loaded page with Plotly.react, without reloading the page."""
+        render_key = f'update-{self._get_render_key(income_node, year, month)}'
+        script = self.render_cache.get(render_key)
+        if script is None:
+            fig_json = self._get_sankey_fig(income_node, year, month).to_json()
+            diagram_div = f'document.getElementById("{self.DIAGRAM_DIV_ID}")'
+            react = f'document.body.style.backgroundColor = figure.layout.paper_bgcolor; Plotly.react("{self.DIAGRAM_DIV_ID}", figure.data, figure.layout, {{responsive: true}});'
+            script = f'(function(figure) {{ if (window.Plotly && {diagram_div}) {{ {react} }} }})({fig_json});'
+            self.render_cache.put(render_key, script)
+        return script
+
+    def get_sankey_theme_script(self, income_node: SankeyRootNode | SankeyTree) -> str:
+        """Get a JavaScript snippet which applies the colors of the current theme to the diagram of an already loaded page, leaving its data untouched."""
+        labels, _, _, _, link_colors = self._get_sankey_arrays(income_node)
+        background_color = Theme.get_colors()['background']
+        font_color = Theme.get_colors()['primary']
+        trace_update = {'node.color': [self.color_palette_service.get_colors(labels)], 'link.hovercolor': [link_colors]}
+        layout_update = {'plot_bgcolor': background_color, 'paper_bgcolor': background_color, 'font.color': font_color, 'title.font.color': font_color}
+        div_id = json.dumps(self.DIAGRAM_DIV_ID)
+        update = f'Plotly.update({div_id}, {json.dumps(trace_update)}, {json.dumps(layout_update)});'
+        return f'document.body.style.backgroundColor = {json.dumps(background_color)}; if (window.Plotly && document.getElementById({div_id})) {{ {update} }}'
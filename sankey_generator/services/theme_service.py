@@ -1,5 +1,6 @@
 """Theme manager for handling theme-related logic and applying themes to the application."""
 
+import os
 from sankey_generator.models.theme import Theme
 from sankey_generator.services.config_service import ConfigService
 
@@ -7,15 +8,23 @@ from sankey_generator.services.config_service import ConfigService
 class ThemeService:
     """Manager for handling theme-related logic."""
 
+    STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources', 'theme.qss')
+
     def __init__(self, config_service):
         """Initialize the theme manager."""
         self.config_service: ConfigService = config_service
+        self.stylesheet_template: str = None
+        # formatted stylesheets by dark mode
+        self.stylesheets: dict[bool, str] = {}
 
     def get_stylesheet(self) -> str:
-        """Apply the current theme to the given window."""
-        colors = Theme.get_colors()
-        with open('sankey_generator/resources/theme.qss', 'r') as file:
-            stylesheet = file.read().format(**colors)
+        """Get the stylesheet of the current theme. The template is read once, relative to the package instead of the working directory."""
+        stylesheet = self.stylesheets.get(Theme.dark_mode)
+        if stylesheet is None:
+            if self.stylesheet_template is None:
+                with open(self.STYLESHEET_PATH, 'r') as file:
+                    self.stylesheet_template = file.read()
+            stylesheet = self.stylesheets[Theme.dark_mode] = self.stylesheet_template.format(**Theme.get_colors())
         return stylesheet
 
     def get_colors(self) -> dict:
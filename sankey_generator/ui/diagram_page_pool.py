@@ -0,0 +1,56 @@
+"""Off-screen web pages with a loaded diagram shell."""
+
+from typing import Callable
+from PyQt6.QtCore import QUrl
+from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile
+
+
+class DiagramPagePool:
+    """
+    Keep off-screen pages with the diagram shell loaded, so a job can render a figure without waiting for the web engine and plotly.js.
+
+    A page is handed out by 'acquire' and loaded with a fresh shell again by 'release'. Pages are never shown, jobs use them to render diagrams off-screen.
+    """
+
+    def __init__(self, profile: QWebEngineProfile, shell_url_factory: Callable[[], QUrl], size: int = 1):
+        """Initialize the pool. The pages are created by 'warm_up'."""
+        self.profile: QWebEngineProfile = profile
+        self.shell_url_factory: Callable[[], QUrl] = shell_url_factory
+        self.size: int = size
+        self.ready_pages: list[QWebEnginePage] = []
+        self.loading_pages: list[QWebEnginePage] = []
+
+    def warm_up(self) -> None:
+        """Create and load pages until the pool is full."""
+        while len(self.ready_pages) + len(self.loading_pages) < self.size:
+            self._load_shell(QWebEnginePage(self.profile))
+
+    def _load_shell(self, page: QWebEnginePage) -> None:
+        """Load the diagram shell into the page, it is ready once the shell was loaded."""
+        self.loading_pages.append(page)
+        page.loadFinished.connect(lambda ok: self._on_shell_loaded(page, ok))
+        page.load(self.shell_url_factory())
+
+    def _on_shell_loaded(self, page: QWebEnginePage, ok: bool) -> None:
+        """Mark the page as ready, or drop it if the shell could not be loaded."""
+        page.loadFinished.disconnect()
+        if page in self.loading_pages:
+            self.loading_pages.remove(page)
+        if ok:
+            self.ready_pages.append(page)
+        else:
+            page.deleteLater()
+
+    def acquire(self) -> QWebEnginePage | None:
+        """Take a ready page out of the pool, or None if no page is ready yet."""
+        if not self.ready_pages:
+            self.warm_up()
+            return None
+        return self.ready_pages.pop()
+
+    def release(self, page: QWebEnginePage) -> None:
+        """Return a page to the pool, it is loaded with a fresh shell."""
+        if len(self.ready_pages) + len(self.loading_pages) < self.size:
+            self._load_shell(page)
+        else:
+            page.deleteLater()
@@ -1,5 +1,6 @@
 """Main window of the Sankey Diagram Generator."""
 
+from typing import TYPE_CHECKING
 from PyQt6.QtWidgets import (
     QMainWindow,
     QVBoxLayout,
@@ -10,15 +11,19 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtWebEngineWidgets import QWebEngineView
 from sankey_generator.ui.animated_toggle import AnimatedToggle
 from sankey_generator.controllers.main_controller import MainController
 from sankey_generator.controllers.config_controller import ConfigController
-from PyQt6.QtWebEngineCore import QWebEngineProfile
 from sankey_generator.utils.observer import ObserverKeys
 from PyQt6.QtCore import QUrl
 from sankey_generator.ui.config_window import ConfigWindow
 from sankey_generator.ui.ui_observable_base_window import UiObservableBaseWindow
+from sankey_generator.ui.sankey_url_scheme_handler import SankeyUrlSchemeHandler
+from sankey_generator.ui.diagram_page_pool import DiagramPagePool
+
+if TYPE_CHECKING:
+    # imported for type hints only, the web view is loaded by 'init_browser' after the window was shown
+    from PyQt6.QtWebEngineWidgets import QWebEngineView
 
 
 class MainWindow(QMainWindow, UiObservableBaseWindow):
@@ -38,10 +43,16 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
             if args[0] == ObserverKeys.SANKEY_GENERATED and isinstance(args[1], QUrl):
                 # Update the browser with the new HTML content
                 self.diagram_browser.setUrl(args[1])
+            elif args[0] == ObserverKeys.SANKEY_UPDATED and isinstance(args[1], str):
+                # Update the diagram of the loaded page without reloading it
+                self.diagram_browser.page().runJavaScript(args[1])
+            elif args[0] == ObserverKeys.SANKEY_PROGRESS and isinstance(args[1], str):
+                # Show the progress of the generation, an empty message clears it
+                self.statusBar().showMessage(args[1])
             elif args[0] == ObserverKeys.THEME_CHANGED and isinstance(args[1], str):
                 # Update the theme
                 self.setStyleSheet(args[1])
-                self.controller.create_and_add_sankey()
+                self.controller.restyle_sankey()
         else:
             raise ValueError(f'Unknown observable: {observable}')
 
@@ -85,6 +96,7 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         self.generate_button = self._create_button('Start Sankey generation', self.controller.on_generate_sankey)
         input_layout.addWidget(self.generate_button)
 
+
         # Dark Mode Switch
         horizontal_layout = QHBoxLayout()
         horizontal_layout.setSpacing(10)
@@ -94,6 +106,15 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         horizontal_layout.addWidget(self.toggle_switch)
         input_layout.addLayout(horizontal_layout)
 
+        # Auto Generate Switch
+        auto_generate_layout = QHBoxLayout()
+        auto_generate_layout.setSpacing(10)
+        auto_generate_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        auto_generate_layout.addWidget(QLabel('Auto Generate'))
+        self.auto_generate_switch: AnimatedToggle = self._create_auto_generate_switch()
+        auto_generate_layout.addWidget(self.auto_generate_switch)
+        input_layout.addLayout(auto_generate_layout)
+
         # Add a button to open the Config Window
         config_button = QPushButton('Configure Filters', self)
         config_button.clicked.connect(self.open_config_window)
@@ -102,12 +123,24 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         # Add input layout to the main layout
         self.layout.addLayout(input_layout, stretch=1)
 
-        # Browser Section
-        self.diagram_browser = self._create_browser()
-        self.layout.addWidget(self.diagram_browser, stretch=5)
+        # Browser Section, created by 'init_browser' once the window is shown
+        self.diagram_browser: 'QWebEngineView' = None
+        self.diagram_page_pool: DiagramPagePool = None
 
         self.central_widget.setLayout(self.layout)
 
+    def init_browser(self):
+        """
+        Create the browser and warm up the web engine. Starting the web engine takes a while, so this is done after the window was shown first.
+
+        The browser loads the diagram shell with plotly.js, so the first diagram is pushed into a warm page. The page pool keeps off-screen shells for rendering without the shown page.
+        """
+        if self.diagram_browser is None:
+            self.diagram_browser = self._create_browser()
+            self.layout.addWidget(self.diagram_browser, stretch=5)
+            self.diagram_page_pool = DiagramPagePool(self.diagram_browser.page().profile(), self.controller.get_diagram_shell_url)
+            self.diagram_page_pool.warm_up()
+
     def _create_dark_mode_switch(self) -> AnimatedToggle:
         """Create a dark mode switch."""
         toggle_switch = AnimatedToggle()
@@ -116,6 +149,14 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         toggle_switch.stateChanged.connect(self.controller.on_toggle_theme)
         return toggle_switch
 
+    def _create_auto_generate_switch(self) -> AnimatedToggle:
+        """Create a switch to generate the diagram whenever the input changes."""
+        toggle_switch = AnimatedToggle()
+        toggle_switch.setFixedSize(toggle_switch.sizeHint())
+        toggle_switch.setChecked(self.controller.auto_generate)
+        toggle_switch.stateChanged.connect(lambda state: self.controller.set_auto_generate(bool(state)))
+        return toggle_switch
+
     def _create_input_field(self, placeholder_text: str, default_value: str, save_func) -> QLineEdit:
         """Create an input field with the given placeholder text and default value."""
         input_field = QLineEdit(self)
@@ -131,13 +172,20 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
 
         return button
 
-    def _create_browser(self) -> QWebEngineView:
+    def _create_browser(self) -> 'QWebEngineView':
         """Create a browser to display the Sankey diagram."""
+        from PyQt6.QtWebEngineCore import QWebEngineProfile
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+
         browser = QWebEngineView()
         profile = QWebEngineProfile.defaultProfile()
         # Handle download requests
         profile.downloadRequested.connect(self.controller.on_download_requested)
-        browser.setHtml(self.controller.get_html())
+        # Serve the diagram pages from memory
+        self.url_scheme_handler = SankeyUrlSchemeHandler(self.controller.page_store, self.controller.plotly_asset_service, self)
+        profile.installUrlSchemeHandler(SankeyUrlSchemeHandler.SCHEME_NAME, self.url_scheme_handler)
+        browser.loadFinished.connect(lambda ok: self.controller.on_diagram_page_load_finished(browser.url(), ok))
+        browser.setUrl(self.controller.show_diagram_shell())
 
         return browser
 
@@ -0,0 +1,56 @@
+"""URL scheme handler serving the diagram pages from memory."""
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtWebEngineCore import QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler
+from sankey_generator.controllers.main_controller import MainController
+from sankey_generator.services.plotly_asset_service import PlotlyAssetService
+from sankey_generator.utils.lru_byte_cache import LruByteCache
+
+
+class SankeyUrlSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serve 'sankey://page/<key>' from the page store of the controller and 'sankey://asset/<plotly.js>' from memory.
+
+    The web engine loads the diagram pages without any file on disk.
+    """
+
+    SCHEME_NAME = MainController.DIAGRAM_SCHEME.encode('utf-8')
+    PAGE_HOST = 'page'
+    ASSET_HOST = 'asset'
+
+    def __init__(self, page_store: LruByteCache, plotly_asset_service: PlotlyAssetService, parent=None):
+        """Initialize the handler."""
+        super().__init__(parent)
+        self.page_store: LruByteCache = page_store
+        self.plotly_asset_service: PlotlyAssetService = plotly_asset_service
+
+    @staticmethod
+    def register_scheme() -> None:
+        """Register the scheme. Must be called before the QApplication is created."""
+        scheme = QWebEngineUrlScheme(SankeyUrlSchemeHandler.SCHEME_NAME)
+        scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+        scheme.setFlags(QWebEngineUrlScheme.Flag.SecureScheme | QWebEngineUrlScheme.Flag.CorsEnabled)
+        QWebEngineUrlScheme.registerScheme(scheme)
+
+    def requestStarted(self, job: QWebEngineUrlRequestJob) -> None:
+        """Reply with the requested page or asset."""
+        url = job.requestUrl()
+        key = url.path().lstrip('/')
+        if url.host() == self.PAGE_HOST:
+            page = self.page_store.get(key)
+            self._reply(job, b'text/html', None if page is None else page.encode('utf-8'))
+        elif url.host() == self.ASSET_HOST and key == self.plotly_asset_service.get_plotly_js_file_name():
+            self._reply(job, b'text/javascript', self.plotly_asset_service.get_plotly_js_bytes())
+        else:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+
+    def _reply(self, job: QWebEngineUrlRequestJob, content_type: bytes, data: bytes | None) -> None:
+        """Reply with the data, or fail if there is none."""
+        if data is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        # the job owns the buffer, so it lives until the reply was read
+        buffer = QBuffer(job)
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(content_type, buffer)
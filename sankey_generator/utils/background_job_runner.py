@@ -0,0 +1,100 @@
+"""Run jobs on a worker thread and deliver their results on the GUI thread."""
+
+from typing import Any, Callable
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class BackgroundJobSignals(QObject):
+    """Signals of a background job. They are created on the GUI thread, so the connected callbacks run there."""
+
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    progress = pyqtSignal(int, str)
+
+
+class BackgroundJob(QRunnable):
+    """A job which calls its function with itself, so the function can report progress and stop early if it was superseded."""
+
+    def __init__(self, job_id: int, function: Callable[['BackgroundJob'], Any], runner: 'BackgroundJobRunner'):
+        """Initialize the job."""
+        super().__init__()
+        self.job_id: int = job_id
+        self.function: Callable[['BackgroundJob'], Any] = function
+        self.runner: BackgroundJobRunner = runner
+        self.signals: BackgroundJobSignals = BackgroundJobSignals()
+
+    def is_cancelled(self) -> bool:
+        """Check if a newer job was submitted or the job was cancelled."""
+        return self.runner.is_superseded(self.job_id)
+
+    def report_progress(self, message: str) -> None:
+        """Report the progress of the job."""
+        if not self.is_cancelled():
+            self.signals.progress.emit(self.job_id, message)
+
+    def run(self) -> None:
+        """Run the job on the worker thread."""
+        if self.is_cancelled():
+            # still deliver, so the runner releases the job
+            self.signals.finished.emit(self.job_id, None)
+            return
+        try:
+            result = self.function(self)
+        except Exception as error:
+            self.signals.failed.emit(self.job_id, str(error))
+            return
+        self.signals.finished.emit(self.job_id, result)
+
+
+class BackgroundJobRunner:
+    """
+    Run jobs one after another on a worker thread. Only the latest submitted job counts.
+
+    Submitting a job supersedes all earlier ones: queued jobs return without running, a running job can stop at its next 'is_cancelled' check, and results,
+    errors and progress of superseded jobs are never delivered. With a single worker the services used by the jobs are never accessed concurrently.
+    """
+
+    def __init__(self, max_thread_count: int = 1):
+        """Initialize the runner with its own thread pool."""
+        self.thread_pool: QThreadPool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_thread_count)
+        self.latest_job_id: int = 0
+        # keep the signals alive until the job delivered its result
+        self.active_jobs: dict[int, BackgroundJob] = {}
+
+    def submit(
+        self,
+        function: Callable[[BackgroundJob], Any],
+        on_finished: Callable[[Any], None],
+        on_failed: Callable[[str], None] = None,
+        on_progress: Callable[[str], None] = None,
+    ) -> int:
+        """Submit a job superseding all earlier jobs and return its id. The callbacks run on the GUI thread."""
+        self.cancel()
+        self.latest_job_id += 1
+        job = BackgroundJob(self.latest_job_id, function, self)
+        job.signals.finished.connect(lambda job_id, result: self._deliver(job_id, on_finished, result))
+        job.signals.failed.connect(lambda job_id, message: self._deliver(job_id, on_failed, message))
+        if on_progress is not None:
+            job.signals.progress.connect(lambda job_id, message: on_progress(message) if not self.is_superseded(job_id) else None)
+        self.active_jobs[job.job_id] = job
+        self.thread_pool.start(job)
+        return job.job_id
+
+    def _deliver(self, job_id: int, callback: Callable[[Any], None], value: Any) -> None:
+        """Pass the result of a job to the callback, unless the job was superseded."""
+        self.active_jobs.pop(job_id, None)
+        if callback is not None and not self.is_superseded(job_id):
+            callback(value)
+
+    def is_superseded(self, job_id: int) -> bool:
+        """Check if the job with the given id is no longer the latest job."""
+        return job_id != self.latest_job_id
+
+    def is_running(self) -> bool:
+        """Check if the latest job has not delivered its result yet."""
+        return self.latest_job_id in self.active_jobs
+
+    def cancel(self) -> None:
+        """Cancel all submitted jobs. Queued jobs return without running, the running job is superseded."""
+        self.latest_job_id += 1
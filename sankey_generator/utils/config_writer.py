@@ -0,0 +1,94 @@
+"""Write-behind writer for the config file."""
+
+import atexit
+import json
+import os
+import stat
+import tempfile
+import threading
+import weakref
+
+
+class ConfigWriter:
+    """
+    Write the config file behind the changes: a burst of changes within 'delay_seconds' costs a single write.
+
+    Every write goes to a temporary file in the same directory which then replaces the config file, so a crash never leaves a half written config.
+    Pending changes of all writers are written when the interpreter exits.
+    """
+
+    # one exit handler flushes all writers, the set does not keep them alive
+    writers: 'weakref.WeakSet[ConfigWriter]' = weakref.WeakSet()
+
+    def __init__(self, file_path: str, delay_seconds: float = 0.5):
+        """Initialize the writer for the given file."""
+        self.file_path: str = os.path.abspath(file_path)
+        self.delay_seconds: float = delay_seconds
+        self.pending_content: str = None
+        self.timer: threading.Timer = None
+        self.lock: threading.Lock = threading.Lock()
+        ConfigWriter.writers.add(self)
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """Write pending changes of all writers now."""
+        for writer in list(cls.writers):
+            writer.flush()
+
+    def write(self, data: dict) -> None:
+        """Schedule writing the data. The data is serialized right away, so it may be changed afterwards."""
+        content = json.dumps(data, indent=4)
+        with self.lock:
+            self.pending_content = content
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay_seconds, self.flush)
+            # the exit handler writes pending changes, the timer must not keep the interpreter alive
+            self.timer.daemon = True
+            self.timer.start()
+
+    def write_now(self, data: dict) -> None:
+        """Write the data immediately."""
+        with self.lock:
+            self.pending_content = json.dumps(data, indent=4)
+        self.flush()
+
+    def flush(self) -> None:
+        """Write pending changes now."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            content = self.pending_content
+            self.pending_content = None
+            if content is None:
+                return
+            self._write_atomic(content)
+
+    def _write_atomic(self, content: str) -> None:
+        """Write the content to a temporary file and replace the config file with it."""
+        directory = os.path.dirname(self.file_path)
+        file_descriptor, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(self.file_path)}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                # the temporary file is only readable by the owner, the config file keeps its mode
+                os.fchmod(file.fileno(), self._get_file_mode())
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _get_file_mode(self) -> int:
+        """Get the mode of the config file, or the default mode of a new file."""
+        try:
+            return stat.S_IMODE(os.stat(self.file_path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+
+atexit.register(ConfigWriter.flush_all)
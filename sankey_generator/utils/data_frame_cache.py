@@ -0,0 +1,68 @@
+"""In-process cache for DataFrames parsed from files."""
+
+from typing import Callable, Hashable
+import pandas as pd
+from sankey_generator.utils.file_identity import FileIdentity
+
+
+class DataFrameCache:
+    """
+    Cache parsed DataFrames keyed on the identity of their source file.
+
+    An entry is reused as long as path, size and modification time are unchanged, so a repeat lookup does not touch the file content.
+    If only the modification time changed, the content hash decides whether the entry is still valid.
+    Cached DataFrames are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.entries: dict[tuple[str, Hashable], tuple[FileIdentity, pd.DataFrame]] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, file_path: str, loader: Callable[[str, FileIdentity], pd.DataFrame], variant: Hashable = None) -> pd.DataFrame:
+        """
+        Return the cached DataFrame for the file or load it with 'loader' if the file changed.
+
+        'loader' is called with the file path and the identity of the file that is loaded.
+        'variant' describes how the loader reads the file (e.g. the selected columns). Only the latest loaded variant of a file is kept.
+        """
+        key = (file_path, variant)
+        entry = self.entries.get(key)
+        new_identity: FileIdentity = None
+        if entry is not None:
+            identity, df = entry
+            if identity.matches_stat(file_path):
+                self.hits += 1
+                return df
+
+            new_identity = FileIdentity.from_file(file_path)
+            if new_identity.content_hash == identity.content_hash:
+                # File was touched but not changed
+                self.entries[key] = (new_identity, df)
+                self.hits += 1
+                return df
+
+        self.misses += 1
+        self.invalidate(file_path)
+        # the content was already hashed if only the stat check failed
+        identity = new_identity if new_identity is not None else FileIdentity.from_file(file_path)
+        df = loader(file_path, identity)
+        self.entries[key] = (identity, df)
+        return df
+
+    def invalidate(self, file_path: str = None) -> None:
+        """Drop all entries of the given file or all entries if no file is given."""
+        if file_path is None:
+            self.entries.clear()
+        else:
+            for key in [key for key in self.entries if key[0] == file_path]:
+                del self.entries[key]
+
+    def get_stats(self) -> dict:
+        """Get the hit and miss counters of the cache."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.entries),
+        }
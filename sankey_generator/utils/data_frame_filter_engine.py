@@ -0,0 +1,58 @@
+"""Combined and memoized boolean masks for DataFrame filters."""
+
+import numpy as np
+import pandas as pd
+from sankey_generator.models.config import DataFrameFilter
+
+
+class DataFrameFilterEngine:
+    """
+    Compile lists of DataFrame filters to one boolean mask per list.
+
+    The mask of every single filter is memoized per dataset, so filters shared by several lists (e.g. 'Analyse-Umbuchung' for income and issues) are computed once.
+    The memo is dropped as soon as masks for another dataset are requested.
+    """
+
+    def __init__(self):
+        """Initialize the engine without a dataset."""
+        self.source: pd.DataFrame = None
+        self.masks: dict[tuple, np.ndarray] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def _get_filter_key(data_frame_filter: DataFrameFilter) -> tuple:
+        """Get a hashable description of a filter."""
+        return (data_frame_filter.csv_column_name, tuple(data_frame_filter.csv_value_filters))
+
+    def _compute_filter_mask(self, df: pd.DataFrame, data_frame_filter: DataFrameFilter) -> np.ndarray:
+        """Compute the mask of the rows whose value in the filter column is one of the filter values."""
+        column = df[data_frame_filter.csv_column_name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # match each category once and look the rows up by their codes
+            category_mask = np.append(column.cat.categories.isin(data_frame_filter.csv_value_filters), False)
+            return category_mask[column.cat.codes.to_numpy()]
+        return column.isin(data_frame_filter.csv_value_filters).to_numpy()
+
+    def get_mask(self, df: pd.DataFrame, data_frame_filters: list[DataFrameFilter]) -> np.ndarray:
+        """Get the mask of the rows of the DataFrame matching all filters."""
+        if df is not self.source:
+            self.source = df
+            self.masks = {}
+
+        list_key = tuple(self._get_filter_key(data_frame_filter) for data_frame_filter in data_frame_filters)
+        mask = self.masks.get(list_key)
+        if mask is not None:
+            self.hits += 1
+            return mask
+
+        self.misses += 1
+        mask = np.ones(len(df), dtype=bool)
+        for data_frame_filter in data_frame_filters:
+            filter_key = (self._get_filter_key(data_frame_filter),)
+            filter_mask = self.masks.get(filter_key)
+            if filter_mask is None:
+                filter_mask = self.masks[filter_key] = self._compute_filter_mask(df, data_frame_filter)
+            mask = mask & filter_mask
+        self.masks[list_key] = mask
+        return mask
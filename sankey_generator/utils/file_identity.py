@@ -0,0 +1,50 @@
+"""Identity of a file on disk used to validate cached data."""
+
+import hashlib
+import os
+
+
+class FileIdentity:
+    """Snapshot of the path, size, modification time and content hash of a file."""
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: str, size: int, mtime_ns: int, content_hash: str):
+        """Initialize the file identity."""
+        self.path: str = path
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+        self.content_hash: str = content_hash
+
+    @staticmethod
+    def from_file(file_path: str) -> 'FileIdentity':
+        """Create the identity of the given file. This reads the whole file to hash its content."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        return FileIdentity(path, stat.st_size, stat.st_mtime_ns, FileIdentity.hash_file(path))
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Return the blake2b hex digest of the content of the given file."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(FileIdentity.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def matches_stat(self, file_path: str) -> bool:
+        """Check if path, size and modification time still match without reading the file."""
+        path = os.path.abspath(file_path)
+        if path != self.path:
+            return False
+        stat = os.stat(path)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def to_dict(self) -> dict:
+        """Convert the file identity to a dictionary."""
+        return {
+            'path': self.path,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'content_hash': self.content_hash,
+        }
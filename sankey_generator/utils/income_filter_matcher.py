@@ -0,0 +1,52 @@
+"""Compiled matcher assigning transactions to income labels."""
+
+import re
+import pandas as pd
+from sankey_generator.models.config import AccountSource
+
+
+class IncomeFilterMatcher:
+    """
+    Classify rows against all income filter values in one regex pass per column.
+
+    Filter values are matched literally and case insensitive as substrings. Every row is assigned to at most one label, so it can't be counted twice:
+    - Columns are checked in the order they first appear in the income filters, the first column with a match decides.
+    - Within a column the leftmost matching value decides, on equal positions the longest value wins.
+    - A value used by several filters belongs to the first filter that lists it.
+    """
+
+    def __init__(self, income_accounts: list[AccountSource]):
+        """Compile the income filters of the given accounts."""
+        self.signature: tuple = IncomeFilterMatcher.get_signature(income_accounts)
+        self.labels: list[str] = []
+        # column name -> (combined pattern, lowercase value -> label)
+        self.column_patterns: dict[str, tuple[str, dict[str, str]]] = {}
+
+        value_labels_by_column: dict[str, dict[str, str]] = {}
+        for label, column, values in self.signature:
+            if label not in self.labels:
+                self.labels.append(label)
+            value_labels = value_labels_by_column.setdefault(column, {})
+            for value in values:
+                value_labels.setdefault(value.lower(), label)
+
+        for column, value_labels in value_labels_by_column.items():
+            if len(value_labels) == 0:
+                continue
+            values = sorted(value_labels, key=len, reverse=True)
+            pattern = '(' + '|'.join(re.escape(value) for value in values) + ')'
+            self.column_patterns[column] = (pattern, value_labels)
+
+    @staticmethod
+    def get_signature(income_accounts: list[AccountSource]) -> tuple:
+        """Get a hashable description of the income filters, used to detect config changes."""
+        return tuple((income_filter.sankey_label, income_filter.csv_column_name, tuple(income_filter.csv_value_filters)) for income_source in income_accounts for income_filter in income_source.income_filters)
+
+    def classify(self, df: pd.DataFrame) -> pd.Series:
+        """Return the label of every row of the DataFrame, or None if no filter matches."""
+        labels = pd.Series(None, index=df.index, dtype=object)
+        for column, (pattern, value_labels) in self.column_patterns.items():
+            # lowercase copy of the column is built once for all values
+            matches = df[column].astype(str).str.lower().str.extract(pattern, expand=False)
+            labels = labels.where(labels.notna(), matches.map(value_labels))
+        return labels
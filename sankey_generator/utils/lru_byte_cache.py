@@ -0,0 +1,64 @@
+"""Least recently used cache bounded by the size of its values."""
+
+from collections import OrderedDict
+
+
+class LruByteCache:
+    """
+    Cache strings up to a total size in bytes (UTF-8), evicting the least recently used entries first.
+
+    A value larger than the whole cache is not stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initialize an empty cache."""
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self.size_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: str) -> str | None:
+        """Get the cached value or None, marking the entry as recently used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value and evict the least recently used entries until the cache fits its bound."""
+        self.remove(key)
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    def remove(self, key: str) -> None:
+        """Remove an entry if it exists."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.entries.clear()
+        self.size_bytes = 0
+
+    def get_stats(self) -> dict:
+        """Get hit rate and memory usage of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            'entries': len(self.entries),
+            'size_bytes': self.size_bytes,
+            'max_bytes': self.max_bytes,
+        }
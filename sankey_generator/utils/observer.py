@@ -6,7 +6,9 @@ class ObserverKeys:
 
     THEME_CHANGED = 'theme'
     SANKEY_GENERATED = 'sankey_generated'
-    OBSERVER_KEYS_MAIN_WINDOW = {THEME_CHANGED, SANKEY_GENERATED}
+    SANKEY_UPDATED = 'sankey_updated'
+    SANKEY_PROGRESS = 'sankey_progress'
+    OBSERVER_KEYS_MAIN_WINDOW = {THEME_CHANGED, SANKEY_GENERATED, SANKEY_UPDATED, SANKEY_PROGRESS}
 
     ISSUES_FITLERS_CHANGED = 'issues_filters_changed'
     INCOME_FITLERS_CHANGED = 'income_filters_changed'
@@ -0,0 +1,48 @@
+"""Analysis month keys of the loaded transactions."""
+
+import numpy as np
+import pandas as pd
+
+
+class PeriodIndex:
+    """
+    The loaded transactions together with the month key of every row.
+
+    The rows keep the order of the file, the keys are computed once per loaded DataFrame and shared by all aggregations of the rollup cube.
+    """
+
+    # Key of rows without a valid analysis month. It is never selected.
+    NO_PERIOD_KEY = -1
+
+    def __init__(self, df: pd.DataFrame, analysis_year_column_name: str, analysis_month_column_name: str):
+        """Build the index. The DataFrame is not copied."""
+        self.df: pd.DataFrame = df
+        self.keys: np.ndarray = PeriodIndex.get_period_keys(df, analysis_year_column_name, analysis_month_column_name)
+
+    @staticmethod
+    def get_period_keys(df: pd.DataFrame, analysis_year_column_name: str, analysis_month_column_name: str) -> np.ndarray:
+        """
+        Get the month key of every row.
+
+        The key is read from the month column ('YYYY-MM'). Without a month column all rows of a year get the key of January of that year.
+        """
+        if analysis_month_column_name:
+            months = df[analysis_month_column_name]
+            if isinstance(months.dtype, pd.CategoricalDtype):
+                # parse each distinct month only once
+                category_keys = PeriodIndex._parse_month_keys(pd.Series(months.cat.categories.astype(str)))
+                codes = months.cat.codes.to_numpy()
+                return np.where(codes >= 0, category_keys[codes], PeriodIndex.NO_PERIOD_KEY)
+            return PeriodIndex._parse_month_keys(months.astype(str))
+
+        years = pd.to_numeric(df[analysis_year_column_name], errors='coerce')
+        return (years * 12).fillna(PeriodIndex.NO_PERIOD_KEY).to_numpy(dtype='int64')
+
+    @staticmethod
+    def _parse_month_keys(months: pd.Series) -> np.ndarray:
+        """Parse 'YYYY-MM' strings to month keys."""
+        years = pd.to_numeric(months.str[:4], errors='coerce')
+        month_numbers = pd.to_numeric(months.str[5:7], errors='coerce')
+        keys = years * 12 + month_numbers - 1
+        valid = (months.str.len() == 7) & (month_numbers >= 1) & (month_numbers <= 12)
+        return keys.where(valid).fillna(PeriodIndex.NO_PERIOD_KEY).to_numpy(dtype='int64')
@@ -0,0 +1,35 @@
+"""Precomputed monthly aggregates of a dataset."""
+
+from sankey_generator.models.period import Period
+from sankey_generator.models.transaction_aggregates import TransactionAggregates
+
+
+class RollupCube:
+    """
+    Aggregates of every month of a dataset for one filter configuration.
+
+    Issue sums are stored for the full hierarchy paths, the sums of the upper hierarchy levels are rolled up when the issue nodes are built.
+    Any period and issue level can therefore be answered without touching the rows again.
+    """
+
+    def __init__(self, signature: tuple, source: object, income_labels: list[str], month_aggregates: dict[int, TransactionAggregates]):
+        """Initialize the cube. 'source' is the dataset the cube was computed from."""
+        self.signature: tuple = signature
+        self.source: object = source
+        self.income_labels: list[str] = income_labels
+        self.month_aggregates: dict[int, TransactionAggregates] = month_aggregates
+        self.month_keys: list[int] = sorted(month_aggregates)
+        # trees built from the cube, keyed by period and issue depth. They are dropped together with the cube.
+        self.sankey_trees: dict[tuple[Period, int], object] = {}
+
+    def is_valid_for(self, signature: tuple, source: object) -> bool:
+        """Check if the cube was computed from the given dataset with the given filter configuration."""
+        return self.source is source and self.signature == signature
+
+    def get_period_aggregates(self, period: Period) -> TransactionAggregates:
+        """Fold the aggregates of the months of the period, in month order."""
+        aggregates = TransactionAggregates(self.income_labels)
+        for month_key in self.month_keys:
+            if period.start_key <= month_key <= period.end_key:
+                aggregates.add(self.month_aggregates[month_key])
+        return aggregates
@@ -0,0 +1,93 @@
+"""Persistent columnar cache stored next to a parsed source file."""
+
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from sankey_generator.utils.file_identity import FileIdentity
+
+
+class SidecarCache:
+    """
+    Store a parsed DataFrame next to its source file so later app starts skip parsing.
+
+    The sidecar is a directory with one uncompressed .npy file per column and a meta.json describing the columns and the source file.
+    Numeric columns and category codes are loaded memory mapped. Text columns are stored as categories.
+    A sidecar is only used if it was written for the same variant (e.g. column selection) and the source file did not change.
+    """
+
+    # version 1 stored the rows sorted by month, version 2 keeps the order of the file
+    FORMAT_VERSION = 2
+    SUFFIX = '.sankey-cache'
+    META_FILE_NAME = 'meta.json'
+
+    def get_sidecar_path(self, file_path: str) -> str:
+        """Get the path of the sidecar directory of the given file."""
+        return os.path.abspath(file_path) + self.SUFFIX
+
+    def _is_valid(self, meta: dict, identity: FileIdentity, variant) -> bool:
+        """Check if the sidecar meta data matches the variant and the identity of the current source file."""
+        if meta.get('format_version') != self.FORMAT_VERSION or meta.get('variant') != json.loads(json.dumps(variant)):
+            return False
+        source = meta['source']
+        # A changed modification time alone (file touched or copied) does not invalidate the sidecar
+        return source['size'] == identity.size and source['content_hash'] == identity.content_hash
+
+    def load(self, file_path: str, identity: FileIdentity, variant=None) -> pd.DataFrame | None:
+        """Load the DataFrame of the given file from its sidecar. Returns None if there is no valid sidecar."""
+        sidecar_path = self.get_sidecar_path(file_path)
+        try:
+            with open(os.path.join(sidecar_path, self.META_FILE_NAME), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            if not self._is_valid(meta, identity, variant):
+                return None
+
+            columns: dict[str, pd.Series] = {}
+            for index, column in enumerate(meta['columns']):
+                values = np.load(os.path.join(sidecar_path, f'{index}.npy'), mmap_mode='r')
+                if column['categories'] is not None:
+                    values = pd.Categorical.from_codes(values, categories=column['categories'])
+                columns[column['name']] = pd.Series(values, copy=False)
+            return pd.DataFrame(columns, copy=False)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, file_path: str, df: pd.DataFrame, identity: FileIdentity, variant=None) -> bool:
+        """Write the DataFrame to the sidecar of the given file. Returns False if the sidecar could not be written."""
+        sidecar_path = self.get_sidecar_path(file_path)
+        temp_path = f'{sidecar_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(temp_path, exist_ok=True)
+            columns: list[dict] = []
+            for index, name in enumerate(df.columns):
+                series = df[name]
+                categories = None
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    values = series.cat.codes.to_numpy()
+                    categories = series.cat.categories.tolist()
+                elif pd.api.types.is_numeric_dtype(series):
+                    values = series.to_numpy()
+                else:
+                    codes, uniques = pd.factorize(series)
+                    values = codes
+                    categories = uniques.tolist()
+                np.save(os.path.join(temp_path, f'{index}.npy'), values, allow_pickle=False)
+                columns.append({'name': name, 'categories': categories})
+
+            meta = {
+                'format_version': self.FORMAT_VERSION,
+                'variant': variant,
+                'source': identity.to_dict(),
+                'columns': columns,
+            }
+            with open(os.path.join(temp_path, self.META_FILE_NAME), 'w', encoding='utf-8') as file:
+                json.dump(meta, file)
+
+            # Replace the old sidecar with the completely written new one
+            shutil.rmtree(sidecar_path, ignore_errors=True)
+            os.replace(temp_path, sidecar_path)
+            return True
+        except (OSError, TypeError, ValueError):
+            shutil.rmtree(temp_path, ignore_errors=True)
+            return False